@@ -1,19 +1,41 @@
 import streamlit as st, os, json
 from app.controllers.chat_controller import ChatController
-from app.services.agreement_extractor import ensure_agreement_json
-from app.utils.loader import load_corpus
+from app.services.shared_data import SharedData
+from app.utils.tracing import TRACER
 
 st.set_page_config(page_title="Banking Co‑Pilot", page_icon="💳", layout="wide")
 
 st.sidebar.title("💳 Banking Co‑Pilot")
 st.sidebar.caption("Deterministic + Agreement‑first (FAISS, Pydantic)")
+stream_answers = st.sidebar.toggle("Stream answers", value=True)
 
-corpus = load_corpus("./data")
-agreement = ensure_agreement_json()
+@st.cache_resource
+def shared_data() -> SharedData:
+    # one corpus/index/router per process; sessions only keep their own chat history
+    return SharedData("./data")
 
+data = shared_data()
 if "controller" not in st.session_state:
-    st.session_state.controller = ChatController(corpus=corpus, agreement=agreement)
+    st.session_state.controller = ChatController(shared=data)
 ctrl = st.session_state.controller
+snap = data.current()
+st.sidebar.caption(f"Data snapshot v{snap.version} · {len(snap.store)} vectors")
+if data.last_error: st.sidebar.warning(f"Data reload failed, serving v{snap.version}: {data.last_error}")
+
+if st.sidebar.toggle("Debug timings", value=False):
+    with st.sidebar.expander("Last answer", expanded=True):
+        last = ctrl.last_trace   # this session's, not whichever session answered last
+        if last is None: st.caption("No answers yet.")
+        else:
+            st.caption(f"{last.ms:.1f} ms total")
+            st.table([{"stage": s.name, "start ms": round(s.start_ms, 1), "ms": round(s.ms, 1), "error": s.error or ""}
+                      for s in last.spans])
+            if last.profile: st.code(last.profile, language="text")
+    with st.sidebar.expander("Per-stage latency"):
+        st.table([{"stage": k, **{m: v for m, v in s.items() if m != "errors"}, "errors": sum(s["errors"].values())}
+                  for k, s in TRACER.stats().items()])
+        st.caption(f"Router: {snap.router.stats()}")
+    st.sidebar.download_button("Prometheus metrics", TRACER.prometheus_text(), file_name="metrics.prom")
 
 st.markdown("## 🧠 Banking Co‑Pilot — deterministic answers")
 st.caption("Ask about balances, statements, transactions, scheduled payments, interest, trailing interest…")
@@ -25,6 +47,7 @@ chips = [
     "are there any scheduled payments?",
     "when was my last payment?",
     "what is my current balance?",
+    "what is my minimum payment?",
     "why was I charged interest in March?",
     "what do I pay to avoid more interest?"
 ]
@@ -45,6 +68,16 @@ for role, text, ev in ctrl.history:
 q = st.chat_input("Ask about balances, statements, transactions, payments, interest…")
 if q:
     ctrl.add_user(q)
-    result = ctrl.answer(q)
+    if stream_answers:
+        st.markdown(f"**🧑‍💻 {q}**")
+        box, partial, result = st.empty(), "", None
+        for kind, val in ctrl.answer_stream(q):
+            if kind == "delta":
+                partial += val
+                box.markdown(f"💡 {partial}▌")
+            else:
+                result = val
+    else:
+        result = ctrl.answer(q)
     ctrl.add_assistant(result["answer"], evidence=result.get("evidence_lines"))
     st.rerun()
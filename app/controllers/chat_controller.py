@@ -1,11 +1,12 @@
-import os, json, re
-from typing import List, Dict, Any
-from app.services.embedder import embed_texts
-from app.core.rag.faiss_store import FaissStore
-from app.services.llm_service import LLMService
+import os, re
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from app.core.rag.documents import render
+from app.services.llm_service import get_llm
+from app.services.prompt_builder import PromptBuilder
 from app.utils.now import now_utc
-from app.services.metrics import detect_total_interest_intent, total_interest_all, total_interest_year, total_interest_month
-from app.services.interest_calc import build_daily_balances_tz, monthly_interest_from_daily
+from app.utils.tracing import Trace, span, trace
+from app.services.shared_data import SharedData, Snapshot, build_snapshot
+from app.services.interest_calc import monthly_interest
 from app.core.schemas import Agreement
 
 SYSTEM = (
@@ -23,61 +24,92 @@ GLOSSARY = _read("./context/glossary.md")
 RULES = _read("./context/rules.md")
 FORMULAS = _read("./context/formulas.md")
 
+# Static context is tokenised once; each request packs retrieved snippets into the remaining token budget.
+PROMPT = PromptBuilder(SYSTEM, GLOSSARY, RULES, FORMULAS)
+PROMPT_CANDIDATES = int(os.getenv("PROMPT_CANDIDATES", "12"))
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")   # hybrid | dense | bm25
+YEAR_MONTH = re.compile(r"(\d{4})-(0[1-9]|1[0-2])")
+
 class ChatController:
-    def __init__(self, corpus: Dict[str, Any], agreement: Agreement|None):
-        self.corpus = corpus
-        self.agreement = agreement
+    # Per-session state (history, last prompt report). Data, index and router come from a read-only Snapshot:
+    # the process-wide one when `shared` is given, else a private one built from corpus/agreement.
+    def __init__(self, corpus: Dict[str, Any]|None = None, agreement: Agreement|None = None,
+                 shared: SharedData|None = None):
+        self.shared = shared
+        self._own = None if shared is not None else build_snapshot(corpus or {}, agreement)
         self.history: List[tuple] = []
-        self._build_index()
+        self.last_prompt: Dict[str, Any] = {}
+        self.last_trace: Optional[Trace] = None   # this session's latest answer, for the debug view
+
+    @property
+    def data(self) -> Snapshot:
+        return self.shared.current() if self.shared is not None else self._own
+
+    # read-only views of the current snapshot
+    corpus = property(lambda self: self.data.corpus)
+    agreement = property(lambda self: self.data.agreement)
+    txns = property(lambda self: self.data.txns)
+    store = property(lambda self: self.data.store)
+    router = property(lambda self: self.data.router)
+    index_stats = property(lambda self: self.data.index_stats)
 
     def add_user(self, msg: str): self.history.append(("user", msg, None))
     def add_assistant(self, msg: str, evidence=None): self.history.append(("assistant", msg, evidence))
 
-    def _build_index(self):
-        docs, payloads = [], []
-        for i, r in enumerate(self.corpus.get("account_summary", [])):
-            docs.append("TYPE:ACCOUNT_SUMMARY RAW:"+json.dumps(r, separators=(",",":"))); payloads.append({"rtype":"account_summary","rid":str(i),"text":docs[-1]})
-        for i, r in enumerate(self.corpus.get("statements", [])):
-            docs.append("TYPE:STATEMENTS RAW:"+json.dumps(r, separators=(",",":"))); payloads.append({"rtype":"statements","rid":str(i),"text":docs[-1]})
-        for i, r in enumerate(self.corpus.get("payments", [])):
-            docs.append("TYPE:PAYMENTS RAW:"+json.dumps(r, separators=(",",":"))); payloads.append({"rtype":"payments","rid":str(i),"text":docs[-1]})
-        for i, r in enumerate(self.corpus.get("transactions", [])):
-            docs.append("TYPE:TRANSACTIONS RAW:"+json.dumps(r, separators=(",",":"))); payloads.append({"rtype":"transactions","rid":str(i),"text":docs[-1]})
-        embs = embed_texts(docs)
-        self.store = FaissStore(embs.shape[1])
-        self.store.add(embs, payloads)
-
-    def _retrieve(self, q: str, k: int=6) -> List[str]:
-        qemb = embed_texts([q])
-        hits = self.store.search(qemb, k=k)
-        return [h[1]["text"][:950] for h in hits]
-
-    def _shortcuts(self, q: str):
-        kind = detect_total_interest_intent(q)
-        if not kind: return None
-        tx = self.corpus.get("transactions", [])
-        if kind == "all":
-            total, ev = total_interest_all(tx); label = "Total interest"
-        elif kind == "year":
-            total, ev = total_interest_year(tx, now_utc()); label = "Total interest this year"
-        else:
-            total, ev = total_interest_month(tx, now_utc()); label = "Total interest this month"
-        ans = f"{label} is ${total:.2f}."
-        ev_lines = [f"{tid or '(no-id)'} · {dt} · ${amt:.2f}" for (tid, amt, dt) in ev]
-        return {"answer": ans, "used_fields":["transactions[POSTED.INTEREST].*"], "notes":"Sum of POSTED INTEREST in window.", "evidence_lines": ev_lines}
+    def _retrieve(self, snap: Snapshot, q: str, k: int=6) -> List[Tuple[float, str]]:
+        with span("retrieve", mode=RETRIEVAL_MODE):
+            hits = snap.retriever.search(q, k=k, now=now_utc(), mode=RETRIEVAL_MODE)
+        return [(score, render(p["rtype"], snap.corpus[p["rtype"]][p["rid"]])) for score, p in hits]
+
+    def _shortcuts(self, snap: Snapshot, q: str):
+        with span("shortcut") as sp:
+            out = snap.router.route(q, now_utc())
+            sp.attrs["intent"] = out.get("intent") if out else None
+        return out
+
+    def _prelude(self, snap: Snapshot, q: str):
+        found = self._retrieve(snap, q, k=PROMPT_CANDIDATES)
+        with span("prompt"):
+            prelude, snippets, self.last_prompt = PROMPT.build(q, found)
+        return snippets, prelude
+
+    def prepare(self, q: str) -> Tuple[Snapshot, Dict[str, Any]|None, List[str], str]:
+        # CPU half of answering: deterministic shortcut, or retrieval + prompt packing for the LLM.
+        # -> (snapshot, shortcut result or None, snippets, prelude)
+        snap = self.data  # one snapshot for the whole answer, even if a reload lands meanwhile
+        sc = self._shortcuts(snap, q)
+        if sc: return snap, sc, [], ""
+        snippets, prelude = self._prelude(snap, q)
+        return snap, None, snippets, prelude
 
     def answer(self, q: str) -> Dict[str, Any]:
-        # 1) Deterministic shortcut
-        sc = self._shortcuts(q)
-        if sc: return sc
+        with trace("answer") as self.last_trace:
+            # 1) Deterministic shortcut, else 2) build prompt with snippets
+            snap, sc, snippets, prelude = self.prepare(q)
+            if sc: return sc
+
+            # 3) LLM
+            with span("llm"): result = get_llm().ask(SYSTEM, prelude)
+            return self.finalize(snap, q, result, snippets)
 
-        # 2) Build prompt with snippets
-        snippets = self._retrieve(q, k=6)
-        prelude = f"# Glossary\n{GLOSSARY}\n\n# Rules\n{RULES}\n\n# Formulas\n{FORMULAS}\n\n# Snippets\n" +                   "\n".join(f"- {s}" for s in snippets) + f"\n\nQuestion: {q}"
+    def answer_stream(self, q: str) -> Iterator[Tuple[str, Any]]:
+        # Same pipeline as answer(), but yields ("delta", text) while the answer streams and ("final", result) last;
+        # the guardrail/calc step runs as soon as the JSON is complete.
+        with trace("answer", profile=False, stream=True) as self.last_trace:
+            snap, sc, snippets, prelude = self.prepare(q)
+            if sc:
+                yield "final", sc; return
+            final = None   # ask_stream records the "llm" span itself, without the time spent in this consumer
+            for kind, val in get_llm().ask_stream(SYSTEM, prelude):
+                if kind == "delta": yield kind, val
+                else: final = val
+            yield "final", self.finalize(snap, q, final, snippets)
 
-        # 3) LLM
-        result = LLMService().ask(SYSTEM, prelude)
+    def finalize(self, snap: Snapshot, q: str, result: Dict[str, Any], snippets: List[str]) -> Dict[str, Any]:
+        with span("calc"):
+            return self._finalize(snap, q, result, snippets)
 
+    def _finalize(self, snap: Snapshot, q: str, result: Dict[str, Any], snippets: List[str]) -> Dict[str, Any]:
         # 4) Guardrail: force calc_request for interest YYYY-MM
         if ("interest" in q.lower()) and not result.get("calc_request"):
             m = re.search(r"(20\d{2})[-/ ]?(\d{1,2})", q)
@@ -86,26 +118,27 @@ class ChatController:
                 result["calc_request"] = {"type":"interest_month","period": ym}
 
         # 5) Execute calc if asked
-        if result.get("calc_request", {}).get("type") == "interest_month":
-            ym = result["calc_request"]["period"]
-            from zoneinfo import ZoneInfo
-            y, m = int(ym[:4]), int(ym[5:7])
-            tz = self.agreement.tz if self.agreement else "America/New_York"
-            basis = self.agreement.apr_basis if self.agreement else 365
-            rounding = self.agreement.rounding if self.agreement else "sum_then_round"
-            apr = (self.agreement.purchaseApr if (self.agreement and self.agreement.purchaseApr is not None) 
-                   else (self.corpus.get("account_summary",[{}])[0].get("purchaseApr", 20.0)))
-            start = datetime(y, m, 1, tzinfo=ZoneInfo(tz))
-            end = datetime(y+1,1,1,tzinfo=ZoneInfo(tz)) if m==12 else datetime(y,m+1,1,tzinfo=ZoneInfo(tz))
-            daily = build_daily_balances_tz(self.corpus.get("transactions", []), start, end, tz=tz)
-            if daily:
-                val = monthly_interest_from_daily(daily, apr, basis, rounding=rounding)
+        calc = result.get("calc_request") if isinstance(result.get("calc_request"), dict) else {}
+        if calc.get("type") == "interest_month" and not YEAR_MONTH.fullmatch(str(calc.get("period", ""))):
+            # the period comes from the question or the LLM, so it is checked before month_bounds sees it
+            result["answer"] = "No matching data found."
+            result["notes"] = f"Period {calc.get('period')!r} is not a valid YYYY-MM month."
+        elif calc.get("type") == "interest_month":
+            ym = calc["period"]
+            ag = snap.agreement or Agreement()
+            acc = snap.corpus.get("account_summary") or []
+            apr = (snap.agreement.purchaseApr if (snap.agreement and snap.agreement.purchaseApr is not None) 
+                   else (acc[0].purchaseApr if acc and acc[0].purchaseApr is not None else 20.0))
+            res = monthly_interest(snap.txns, [ym], snap.agreement, aprs={"purchaseApr": apr})
+            if res:
+                val = res[ym]["purchaseApr"]
                 result["answer"] = f"Interest for {ym} (calculated) is ${val:.2f}."
                 result.setdefault("used_fields", []).extend(["transactions[month].*","agreement.*"])
-                result["notes"] = f"TZ={tz}, basis={basis}, rounding={rounding}, APR={apr}%."
+                result["notes"] = f"TZ={ag.tz}, basis={ag.apr_basis}, rounding={ag.rounding}, APR={apr}%."
             else:
                 result["answer"] = "No matching data found."
                 result["notes"] = "No posted transactions to build daily balances."
 
         result["evidence_lines"] = [s[:140]+("…" if len(s)>140 else "") for s in snippets]
+        result["prompt_tokens"] = self.last_prompt
         return result
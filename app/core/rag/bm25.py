@@ -0,0 +1,87 @@
+import re, numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+_ISO_MONTH = re.compile(r"\b(\d{4})-(\d{2})(?:-\d{2})?\b")
+BUILD_BATCH = 8192   # docs whose postings are buffered as Python ints before they are packed into arrays
+MONTHS = ("january", "february", "march", "april", "may", "june", "july", "august", "september", "october",
+          "november", "december")
+
+def tokenize(text: str) -> List[str]:
+    # lower-cased words/numbers; ISO dates also yield their month name so "March" matches "2025-03-14"
+    text = text.lower()
+    toks = _TOKEN.findall(text)
+    for y, m in _ISO_MONTH.findall(text):
+        if 1 <= int(m) <= 12: toks.append(MONTHS[int(m) - 1])
+    return toks
+
+class BM25:
+    # In-process Okapi BM25 over an inverted index stored as CSR arrays (term -> doc ids / term frequencies).
+    # Documents are addressed by their position in the build order.
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.vocab: Dict[str, int] = {}
+        self.n_docs = 0
+        self.indptr = np.zeros(1, dtype="int64")
+        self.doc_ids = np.zeros(0, dtype="int32")
+        self.weights = np.zeros(0, dtype="float32")   # tf part of BM25, length-normalised at build time
+        self.idf = np.zeros(0, dtype="float32")
+
+    @classmethod
+    def build(cls, texts: Iterable[str], k1: float = 1.2, b: float = 0.75) -> "BM25":
+        # Postings are collected per batch of BUILD_BATCH docs into int32/float32 arrays, so Python objects exist
+        # for one batch at most; texts are consumed one at a time and not kept (pass a generator to stream them).
+        self = cls(k1, b)
+        chunks: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []   # (term, doc, tf) per batch
+        lengths: List[np.ndarray] = []
+        terms: List[int] = []; tfs: List[int] = []; nterms: List[int] = []; dls: List[int] = []
+        def flush(first_doc: int):
+            if not nterms: return
+            docs = np.repeat(np.arange(first_doc, first_doc + len(nterms), dtype="int32"), nterms)
+            chunks.append((np.asarray(terms, dtype="int32"), docs, np.asarray(tfs, dtype="float32")))
+            lengths.append(np.asarray(dls, dtype="float32"))
+            terms.clear(); tfs.clear(); nterms.clear(); dls.clear()
+        n = 0
+        for text in texts:
+            counts: Dict[int, int] = {}
+            toks = tokenize(text)
+            for t in toks:
+                tid = self.vocab.setdefault(t, len(self.vocab))
+                counts[tid] = counts.get(tid, 0) + 1
+            terms.extend(counts); tfs.extend(counts.values()); nterms.append(len(counts)); dls.append(len(toks))
+            n += 1
+            if len(nterms) == BUILD_BATCH: flush(n - BUILD_BATCH)
+        flush(n - len(nterms))
+        dl = np.concatenate(lengths) if lengths else np.zeros(0, dtype="float32")
+        self.n_docs = len(dl)
+        if not chunks or not sum(len(c[0]) for c in chunks): return self
+        term, docs, tf = (np.concatenate(cols) for cols in zip(*chunks))
+        del chunks
+        order = np.argsort(term, kind="stable")   # docs are already ascending within each term
+        term, docs, tf = term[order], docs[order], tf[order]
+        del order
+        norm = k1 * (1 - b + b * dl[docs] / max(float(dl.mean()), 1e-9))
+        df = np.bincount(term, minlength=len(self.vocab))
+        self.indptr = np.concatenate([[0], np.cumsum(df)]).astype("int64")
+        self.doc_ids = docs
+        self.weights = (tf * (k1 + 1) / (tf + norm)).astype("float32")
+        self.idf = np.log1p((self.n_docs - df + 0.5) / (df + 0.5)).astype("float32")
+        return self
+
+    def scores(self, query: str) -> np.ndarray:
+        out = np.zeros(self.n_docs, dtype="float32")
+        for t in set(tokenize(query)):
+            tid = self.vocab.get(t)
+            if tid is None: continue
+            s, e = self.indptr[tid], self.indptr[tid + 1]
+            out[self.doc_ids[s:e]] += self.idf[tid] * self.weights[s:e]  # a term lists each doc once
+        return out
+
+    def search(self, query: str, k: int = 8, mask: Optional[np.ndarray] = None) -> List[Tuple[float, int]]:
+        # -> [(score, doc)] best first; docs outside mask (bool per doc) and zero-score docs are skipped
+        sc = self.scores(query)
+        if mask is not None: sc[~mask] = 0.0
+        cand = np.flatnonzero(sc > 0)
+        if len(cand) > k: cand = cand[np.argpartition(-sc[cand], k - 1)[:k]]
+        cand = cand[np.lexsort((cand, -sc[cand]))]
+        return [(float(sc[d]), int(d)) for d in cand]
@@ -0,0 +1,44 @@
+from typing import Any, Callable, Dict, Optional
+
+# Retrieval documents: one short sentence per record instead of its raw JSON. These strings are what gets embedded
+# and what lands in the prompt, so they carry the ids, dates and amounts the LLM cites and nothing else.
+
+def _money(v: Optional[float]) -> str:
+    return "n/a" if v is None else (f"-${-v:,.2f}" if v < 0 else f"${v:,.2f}")
+
+def _day(ts: Optional[str]) -> str:
+    return ts[:10] if ts else "n/a"
+
+def _account_summary(r) -> str:
+    return (f"Account {r.accountId} summary: current balance {_money(r.currentBalance)}, statement balance "
+            f"{_money(r.statementBalance)}, credit limit {_money(r.creditLimit)}, available credit "
+            f"{_money(r.availableCredit)}, purchase APR {r.purchaseApr if r.purchaseApr is not None else 'n/a'}%, "
+            f"status {r.highestPriorityStatus or 'n/a'}, billing cycle {_day(r.billingCycleOpenDateTime)} to "
+            f"{_day(r.billingCycleCloseDateTime)}.")
+
+def _statement(r) -> str:
+    return (f"Statement {r.statementId} for {_day(r.openingDateTime)} to {_day(r.closingDateTime)}: interest charged "
+            f"{_money(r.interestCharged)}, fees {_money(r.feesCharged)}, purchases {_money(r.purchases)}, payments and "
+            f"credits {_money(r.paymentsAndCredits)}, unpaid balance {_money(r.unpaidBalance)}, minimum payment due "
+            f"{_money(r.minimumPaymentDue)} by {r.dueDate}.")
+
+def _payment(r) -> str:
+    src = ", ".join(f"{s.get('fundingType', 'account')} ending {s.get('last4Account', '????')}"
+                    for s in (r.fundingSource or []) if isinstance(s, dict))
+    eff = f", effective {_day(r.effectiveDateTime)}" if r.effectiveDateTime else ""
+    return f"Payment {r.paymentId}: {r.state} {_money(r.amount)} on {_day(r.paymentDateTime)}{eff}" + (f" from {src}." if src else ".")
+
+def _transaction(r) -> str:
+    end = f", ending balance {_money(r.endingBalance)}" if r.endingBalance is not None else ""
+    return (f"Transaction {r.transactionId}: {r.transactionStatus} {r.transactionType} of {_money(r.amount)} on "
+            f"{_day(r.transactionDateTime)}{end}.")
+
+RENDERERS: Dict[str, Callable[[Any], str]] = {
+    "account_summary": _account_summary,
+    "statements": _statement,
+    "payments": _payment,
+    "transactions": _transaction,
+}
+
+def render(rtype: str, record: Any) -> str:
+    return RENDERERS[rtype](record)
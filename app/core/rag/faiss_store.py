@@ -1,29 +1,351 @@
-import numpy as np, faiss
-from typing import List, Dict, Any, Tuple
+import os, json, math, hashlib, numpy as np, faiss
+from collections import deque
+from typing import List, Dict, Any, Tuple, Iterable, Callable, Optional
+
+INDEX_FILE = "index.faiss"
+PAYLOAD_FILE = "payloads.npz"
+META_FILE = "meta.json"
+INDEX_KINDS = ("flat", "ivf", "hnsw", "ivfpq")
+MAX_TRAIN = 100_000
+EXACT_SUBSET = 4096   # filtered searches over at most this many vectors are scored exactly
+COMPACT_RATIO = 0.25   # save() renumbers vector ids once dead id slots exceed this share of live vectors
+RETRAIN_GROWTH = 4    # a persisted IVF/PQ index is rebuilt once it holds this many times the vectors it was trained for
 
 def _l2_normalize(x: np.ndarray) -> np.ndarray:
     n = np.linalg.norm(x, axis=1, keepdims=True) + 1e-12
     return x / n
 
+def _h64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+def content_hash(text: str) -> int:
+    return _h64(text)
+
+def key_hash(key: str) -> int:
+    return _h64("k\0" + key)
+
+def index_config_from_env() -> Dict[str, Any]:
+    # FAISS_INDEX=flat|ivf|hnsw|ivfpq; unset tuning knobs are derived from corpus size at train time.
+    cfg: Dict[str, Any] = {"kind": os.getenv("FAISS_INDEX", "flat").lower()}
+    for env, key in [("FAISS_NLIST","nlist"),("FAISS_NPROBE","nprobe"),("FAISS_HNSW_M","hnsw_m"),
+                     ("FAISS_EF_CONSTRUCTION","ef_construction"),("FAISS_EF_SEARCH","ef_search"),
+                     ("FAISS_PQ_M","pq_m"),("FAISS_PQ_NBITS","pq_nbits")]:
+        if os.getenv(env): cfg[key] = int(os.environ[env])
+    return cfg
+
+def _build_params(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    # nprobe/efSearch are query-time knobs; changing them must not invalidate a persisted index
+    return {k: v for k, v in cfg.items() if k not in ("nprobe", "ef_search")}
+
+def _pq_m(dim: int, want: Optional[int]) -> int:
+    # sub-quantizer count must divide dim; default targets ~8 dims per code byte
+    m = want or max(1, dim // 8)
+    while dim % m: m -= 1
+    return m
+
+def _make_index(dim: int, cfg: Dict[str, Any], n_train: int):
+    kind = cfg.get("kind", "flat")
+    if kind == "hnsw":
+        inner = faiss.IndexHNSWFlat(dim, int(cfg.get("hnsw_m", 32)), faiss.METRIC_INNER_PRODUCT)
+        inner.hnsw.efConstruction = int(cfg.get("ef_construction", 80))
+        return faiss.IndexIDMap2(inner), kind
+    if kind in ("ivf", "ivfpq"):
+        nlist = int(cfg.get("nlist") or max(1, min(65536, int(4 * math.sqrt(max(n_train, 1))), n_train // 39)))
+        nbits = int(cfg.get("pq_nbits", 8))
+        need = max(nlist, 2 ** nbits if kind == "ivfpq" else 0)
+        if n_train >= need:
+            quant = faiss.IndexFlatIP(dim)
+            if kind == "ivf":
+                return faiss.IndexIVFFlat(quant, dim, nlist, faiss.METRIC_INNER_PRODUCT), kind
+            return faiss.IndexIVFPQ(quant, dim, nlist, _pq_m(dim, cfg.get("pq_m")), nbits, faiss.METRIC_INNER_PRODUCT), kind
+        # too few vectors to train the quantizers; exact search is cheaper anyway
+    return faiss.IndexIDMap2(faiss.IndexFlatIP(dim)), "flat"
+
 class FaissStore:
-    def __init__(self, dim: int):
-        self.index = faiss.IndexFlatIP(dim)
+    def __init__(self, dim: int, meta: Optional[Dict[str, Any]] = None, config: Optional[Dict[str, Any]] = None):
         self.dim = dim
-        self.payloads: List[Dict[str, Any]] = []
+        self.meta = dict(meta or {})
+        self.config = dict(config or {"kind": "flat"})
+        if self.config.get("kind", "flat") not in INDEX_KINDS:
+            raise ValueError(f"Unknown FAISS index kind: {self.config.get('kind')}")
+        self.kind = "flat"
+        self.n_train = 0   # vectors indexed when the quantizers were trained (IVF/PQ sizing)
+        self.index = None if self.config.get("kind", "flat") != "flat" else _make_index(dim, self.config, 0)[0]
+        # Payload side table, indexed by vector id: (rtype code, source row, 64-bit content hash). Texts are not kept;
+        # callers render them from the source record for the hits they actually use.
+        self.rtypes: List[str] = []
+        self._rtype = np.full(0, -1, dtype="int8")
+        self._rid = np.zeros(0, dtype="int64")
+        self._hash = np.zeros(0, dtype="uint64")
+        self.keys: Dict[int, int] = {}     # 64-bit hash of record key -> vector id
+        self._next_id = 0
+        self._deferred: Optional[Dict[str, list]] = None   # HNSW changes held back until the end of a sync
+
+    def __len__(self): return int(self.index.ntotal) if self.index is not None else 0
 
-    def add(self, vecs: np.ndarray, payloads: List[Dict[str, Any]]):
+    @property
+    def is_trained(self) -> bool: return self.index is not None and bool(self.index.is_trained)
+
+    def train(self, vecs: np.ndarray):
+        # Builds the configured backend sized for this sample; IVF/PQ codebooks are learned from it.
         vecs = _l2_normalize(vecs.astype("float32"))
-        self.index.add(vecs)
-        self.payloads.extend(payloads)
+        self.n_train = len(vecs)
+        if len(vecs) > MAX_TRAIN:
+            vecs = vecs[np.random.default_rng(0).choice(len(vecs), MAX_TRAIN, replace=False)]
+        self.index, self.kind = _make_index(self.dim, self.config, len(vecs))
+        if not self.index.is_trained: self.index.train(vecs)
+        self.set_search_params()
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+        if nprobe is not None: self.config["nprobe"] = int(nprobe)
+        if ef_search is not None: self.config["ef_search"] = int(ef_search)
+        if self.index is None: return
+        if self.kind in ("ivf", "ivfpq"):
+            ivf = faiss.extract_index_ivf(self.index)
+            ivf.nprobe = int(self.config.get("nprobe") or max(1, ivf.nlist // 16))
+        elif self.kind == "hnsw":
+            faiss.downcast_index(self.index.index).hnsw.efSearch = int(self.config.get("ef_search", 64))
+
+    def _grow(self, n: int):
+        if n <= len(self._rid): return
+        cap = max(n, 2 * len(self._rid), 1024)
+        self._rtype = np.concatenate([self._rtype, np.full(cap - len(self._rtype), -1, dtype="int8")])
+        self._rid = np.concatenate([self._rid, np.zeros(cap - len(self._rid), dtype="int64")])
+        self._hash = np.concatenate([self._hash, np.zeros(cap - len(self._hash), dtype="uint64")])
+
+    def _code(self, rtype: str) -> int:
+        if rtype not in self.rtypes: self.rtypes.append(rtype)
+        return self.rtypes.index(rtype)
+
+    def payload(self, vid: int) -> Dict[str, Any]:
+        return {"rtype": self.rtypes[self._rtype[vid]], "rid": int(self._rid[vid])}
+
+    def add(self, vecs: np.ndarray, payloads: List[Dict[str, Any]], keys: Optional[List[str]] = None,
+            hashes: Optional[List[int]] = None):
+        # payloads: {"rtype": str, "rid": int row in the source list}
+        if self.index is None: self.train(vecs)
+        vecs = _l2_normalize(vecs.astype("float32"))
+        ids = np.arange(self._next_id, self._next_id + len(payloads), dtype="int64")
+        if self._deferred is not None:
+            self._deferred["vecs"].append(vecs); self._deferred["ids"].append(ids)
+        else:
+            self.index.add_with_ids(vecs, ids)
+        self._grow(self._next_id + len(payloads))
+        for j, (vid, p) in enumerate(zip(ids.tolist(), payloads)):
+            key = keys[j] if keys else f"{p.get('rtype','')}:{p.get('rid', vid)}"
+            self._rtype[vid] = self._code(p.get("rtype", ""))
+            self._rid[vid] = int(p.get("rid", vid))
+            if hashes: self._hash[vid] = hashes[j]
+            self.keys[key_hash(key)] = vid
+        self._next_id += len(payloads)
+
+    def remove(self, keys: Iterable[str]) -> int:
+        return self._remove_keys(key_hash(k) for k in keys)
+
+    def _remove_keys(self, khs: Iterable[int]) -> int:
+        ids = []
+        for kh in khs:
+            vid = self.keys.pop(kh, None)
+            if vid is None: continue
+            self._rtype[vid] = -1; ids.append(vid)
+        if ids: self._remove_ids(np.asarray(ids, dtype="int64"))
+        return len(ids)
+
+    def _remove_ids(self, ids: np.ndarray):
+        if self.kind != "hnsw":
+            self.index.remove_ids(ids); return
+        if self._deferred is not None:
+            self._deferred["drop"].append(ids); return
+        self._rebuild_hnsw(ids)
+
+    def _rebuild_hnsw(self, drop: np.ndarray, vecs: Optional[np.ndarray] = None, ids: Optional[np.ndarray] = None):
+        # HNSW graphs cannot drop nodes: rebuild from the stored vectors minus the dropped ids, plus any new ones
+        inner = faiss.downcast_index(self.index.index)
+        n = self.index.ntotal
+        xb = faiss.rev_swig_ptr(faiss.downcast_index(inner.storage).get_xb(), n * self.dim).reshape(n, self.dim)
+        id_map = faiss.vector_to_array(self.index.id_map)
+        keep = ~np.isin(id_map, drop)
+        xb, id_map = xb[keep], id_map[keep]   # fancy indexing copies out of the old index before it is dropped
+        if ids is not None and len(ids):
+            xb, id_map = np.vstack([xb, vecs]), np.concatenate([id_map, ids])
+        self.index, _ = _make_index(self.dim, self.config, len(id_map))
+        self.set_search_params()
+        if len(id_map): self.index.add_with_ids(xb, id_map)
+
+    def _flush_deferred(self):
+        # One HNSW rebuild for all removals of a sync (added vectors go in with it), or a plain add if none
+        d, self._deferred = self._deferred, None
+        if d is None or self.index is None: return
+        drop = np.concatenate(d["drop"]) if d["drop"] else np.zeros(0, dtype="int64")
+        ids = np.concatenate(d["ids"]) if d["ids"] else np.zeros(0, dtype="int64")
+        vecs = np.vstack(d["vecs"]) if d["vecs"] else np.zeros((0, self.dim), dtype="float32")
+        if len(drop):
+            new = ~np.isin(ids, drop)   # a key updated twice in one sync drops its first new vector too
+            self._rebuild_hnsw(drop, vecs[new], ids[new])
+        elif len(ids):
+            self.index.add_with_ids(vecs, ids)
+
+    def sync(self, items: Iterable[Tuple[str, str, Dict[str, Any]]],
+             embed: Optional[Callable[[List[str]], np.ndarray]] = None, batch_size: int = 2048,
+             embed_batches: Optional[Callable[[Iterable[List[str]]], Iterable[np.ndarray]]] = None) -> Dict[str, int]:
+        # items: (key, text, payload), consumed lazily. Only new/changed texts are embedded, batch by batch,
+        # so memory is bounded by the batches in flight; keys not seen by the end are dropped. HNSW changes are
+        # collected and applied once at the end, so the graph is rebuilt at most once per sync.
+        if self.config.get("kind") == "hnsw" and self._deferred is None:
+            self._deferred = {"drop": [], "vecs": [], "ids": []}
+            try:
+                return self.sync(items, embed, batch_size, embed_batches)
+            finally:
+                self._flush_deferred()
+        seen, pending, stats = set(), deque(), {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        def todo_batches():
+            batch = []
+            for key, text, payload in items:
+                kh, h = key_hash(key), content_hash(text)
+                seen.add(kh)
+                vid = self.keys.get(kh)
+                if vid is not None and int(self._hash[vid]) == h:
+                    self._rid[vid] = int(payload.get("rid", self._rid[vid]))  # row may move even if content is identical
+                    stats["unchanged"] += 1; continue
+                batch.append((key, text, payload, h))
+                if len(batch) >= batch_size:
+                    pending.append(batch); yield [t[1] for t in batch]; batch = []
+            if batch:
+                pending.append(batch); yield [t[1] for t in batch]
+        embed_batches = embed_batches or (lambda bs: (embed(b) for b in bs))
+        train_buf: List[Tuple[list, np.ndarray]] = []
+        trained = self.index is None
+        def flush(batch, embs):
+            n = self.remove(t[0] for t in batch)
+            self.add(embs, [t[2] for t in batch], keys=[t[0] for t in batch], hashes=[t[3] for t in batch])
+            stats["updated"] += n; stats["added"] += len(batch) - n
+        for embs in embed_batches(todo_batches()):
+            batch = pending.popleft()
+            if self.index is None:
+                # untrained backend: buffer a training sample (bounded by MAX_TRAIN) before the first add
+                train_buf.append((batch, embs))
+                if sum(len(e) for _, e in train_buf) < MAX_TRAIN: continue
+                self.train(np.vstack([e for _, e in train_buf]))
+                for b, e in train_buf: flush(b, e)
+                train_buf = []; continue
+            flush(batch, embs)
+        if train_buf:
+            self.train(np.vstack([e for _, e in train_buf]))
+            for b, e in train_buf: flush(b, e)
+        stats["removed"] = self._remove_keys([kh for kh in self.keys if kh not in seen])
+        if trained: self.n_train = max(self.n_train, len(self))   # the sample is capped; the build covers them all
+        return stats
+
+    def compact(self) -> int:
+        # Renumbers live vectors to ids 0..n-1 (order kept). Removed/updated records leave dead slots in the
+        # id-indexed payload arrays and ids only ever grow, so without this every resync with updates grows them.
+        live = np.sort(np.fromiter(self.keys.values(), dtype="int64", count=len(self.keys)))
+        dead = self._next_id - len(live)
+        if dead <= 0: return 0
+        remap = np.full(self._next_id, -1, dtype="int64")
+        remap[live] = np.arange(len(live), dtype="int64")
+        if self.index is not None:
+            if isinstance(self.index, faiss.IndexIDMap2):
+                faiss.copy_array_to_vector(remap[faiss.vector_to_array(self.index.id_map)], self.index.id_map)
+                self.index.construct_rev_map()
+            else:   # IVF/IVFPQ keep ids in their inverted lists
+                ivf = faiss.extract_index_ivf(self.index)
+                inv = ivf.invlists
+                for l in range(ivf.nlist):
+                    n = inv.list_size(l)
+                    if not n: continue
+                    ids = remap[faiss.rev_swig_ptr(inv.get_ids(l), n)]
+                    codes = faiss.rev_swig_ptr(inv.get_codes(l), n * inv.code_size).copy()
+                    inv.update_entries(l, 0, n, faiss.swig_ptr(ids), faiss.swig_ptr(codes))
+                if ivf.direct_map.type != faiss.DirectMap.NoMap: ivf.make_direct_map(True)
+        self._rtype, self._rid, self._hash = self._rtype[live], self._rid[live], self._hash[live]
+        self.keys = {kh: int(remap[vid]) for kh, vid in self.keys.items()}
+        self._next_id = len(live)
+        return int(dead)
+
+    def save(self, path: str):
+        if self.index is None: return  # untrained and empty: nothing worth persisting
+        if self._next_id - len(self.keys) > COMPACT_RATIO * max(len(self.keys), 1): self.compact()
+        os.makedirs(path, exist_ok=True)
+        ipath, ppath, mpath = (os.path.join(path, f) for f in (INDEX_FILE, PAYLOAD_FILE, META_FILE))
+        n = self._next_id
+        faiss.write_index(self.index, ipath + ".tmp")
+        with open(ppath + ".tmp", "wb") as f:
+            np.savez(f, key=np.fromiter(self.keys.keys(), dtype="uint64", count=len(self.keys)),
+                     vid=np.fromiter(self.keys.values(), dtype="int64", count=len(self.keys)),
+                     rtype=self._rtype[:n], rid=self._rid[:n], hash=self._hash[:n])
+        side = {"dim": self.dim, "meta": self.meta, "config": self.config, "kind": self.kind, "next_id": n,
+                "rtypes": self.rtypes, "count": len(self.keys), "n_train": self.n_train}
+        with open(mpath + ".tmp", "w") as f: json.dump(side, f)
+        os.replace(ipath + ".tmp", ipath)
+        os.replace(ppath + ".tmp", ppath)
+        os.replace(mpath + ".tmp", mpath)
+
+    @classmethod
+    def load(cls, path: str, meta: Optional[Dict[str, Any]] = None,
+             config: Optional[Dict[str, Any]] = None) -> Optional["FaissStore"]:
+        # Returns None when nothing usable is on disk (missing, corrupt, or built with other meta/index config).
+        ipath, ppath, mpath = (os.path.join(path, f) for f in (INDEX_FILE, PAYLOAD_FILE, META_FILE))
+        if not all(os.path.exists(p) for p in (ipath, ppath, mpath)): return None
+        try:
+            with open(mpath, "r") as f: side = json.load(f)
+            arrs = dict(np.load(ppath))
+            index = faiss.read_index(ipath)
+        except Exception:
+            return None
+        if meta is not None and side.get("meta") != meta: return None
+        if config is not None:
+            if _build_params(side.get("config", {"kind": "flat"})) != _build_params(config): return None
+            # a too-small first build falls back to flat, and IVF/PQ lists are sized for the corpus they were
+            # trained on: rebuild once the real backend can be trained, or once the corpus has outgrown them
+            if side.get("kind", "flat") != config.get("kind", "flat"): return None
+            if side["kind"] in ("ivf", "ivfpq") and index.ntotal > RETRAIN_GROWTH * int(side.get("n_train", 0)): return None
+        if index.ntotal != side["count"] or len(arrs["key"]) != side["count"]: return None
+        st = cls(int(side["dim"]), side.get("meta"), {**side.get("config", {}), **(config or {})})
+        st.index, st.kind, st.n_train = index, side.get("kind", "flat"), int(side.get("n_train", 0))
+        st.set_search_params()
+        st._next_id, st.rtypes = int(side["next_id"]), list(side["rtypes"])
+        st._rtype, st._rid, st._hash = arrs["rtype"], arrs["rid"], arrs["hash"]
+        st.keys = dict(zip(arrs["key"].tolist(), arrs["vid"].tolist()))
+        return st
+
+    def ids_for(self, rtype: str, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        # vector ids of live records of one type, optionally limited to a boolean mask over source rows
+        if rtype not in self.rtypes: return np.zeros(0, dtype="int64")
+        n = self._next_id
+        hit = self._rtype[:n] == self.rtypes.index(rtype)
+        if rows is not None:
+            rid = self._rid[:n]
+            ok = hit & (rid < len(rows))
+            hit[:] = False
+            hit[ok] = rows[rid[ok]]
+        return np.flatnonzero(hit).astype("int64")
+
+    def _search_params(self, sel):
+        if self.kind in ("ivf", "ivfpq"):
+            return faiss.SearchParametersIVF(sel=sel, nprobe=faiss.extract_index_ivf(self.index).nprobe)
+        if self.kind == "hnsw":
+            return faiss.SearchParametersHNSW(sel=sel, efSearch=int(self.config.get("ef_search", 64)))
+        return faiss.SearchParameters(sel=sel)
 
-    def search(self, qvec: np.ndarray, k: int=8) -> List[Tuple[float, Dict[str, Any]]]:
+    def search(self, qvec: np.ndarray, k: int=8, ids: Optional[np.ndarray] = None) -> List[Tuple[float, Dict[str, Any]]]:
+        # ids: restrict to these vector ids (see ids_for). Small subsets of flat/HNSW indexes are scored exactly
+        # from the stored vectors; otherwise FAISS skips non-matching ids through an IDSelector.
+        if not len(self) or (ids is not None and not len(ids)): return []
         q = _l2_normalize(qvec.astype("float32"))
-        D, I = self.index.search(q, k)
+        if ids is not None and len(ids) <= EXACT_SUBSET and self.kind in ("flat", "hnsw"):
+            sc = self.index.reconstruct_batch(ids) @ q.reshape(-1)
+            top = np.argsort(-sc, kind="stable")[:k]
+            D, I = sc[top], ids[top]
+        elif ids is not None:
+            D, I = self.index.search(q, k, params=self._search_params(faiss.IDSelectorBatch(ids)))
+        else:
+            D, I = self.index.search(q, k)
         out = []
         idxs = I[0] if I.ndim>1 else I
         ds = D[0] if D.ndim>1 else D
         for rank, idx in enumerate(idxs):
             if idx == -1: continue
-            out.append((float(ds[rank]), self.payloads[idx]))
+            out.append((float(ds[rank]), self.payload(int(idx))))
         # stable secondary sort (rtype, rid) to break ties
-        return sorted(out, key=lambda x: (-x[0], x[1].get("rtype",""), x[1].get("rid","")))
+        return sorted(out, key=lambda x: (-x[0], x[1]["rtype"], x[1]["rid"]))
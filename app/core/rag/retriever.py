@@ -0,0 +1,141 @@
+import re, time, numpy as np
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.core.rag.bm25 import BM25, MONTHS
+from app.core.rag.documents import RENDERERS, render
+from app.core.rag.faiss_store import FaissStore
+from app.utils.tracing import span
+
+# Date each record type is filtered on (UTC calendar day); the account summary has none and is never date-filtered.
+DATE_FIELDS = {"statements": "closingDateTime", "payments": "paymentDateTime", "transactions": "transactionDateTime"}
+RETRIEVAL_MODES = ("hybrid", "dense", "bm25")
+
+TYPE_PATTERNS = [
+    (re.compile(r"\b(transactions?|purchases?|charged?|charges|interest|fees?|spen[dt]|bought|refunds?|ending balance)\b", re.I), "transactions"),
+    (re.compile(r"\b(statements?|due date|minimum (payment|due)|billing period|interest)\b", re.I), "statements"),
+    (re.compile(r"\b(payments?|paid|pay|autopay|scheduled)\b", re.I), "payments"),
+    (re.compile(r"\b(balance|credit limit|available credit|apr|status|delinquent|billing cycle)\b", re.I), "account_summary"),
+]
+_YM = re.compile(r"\b(\d{4})-(\d{2})\b")
+_MONTH = re.compile(r"\b(?:(" + "|".join(m for m in MONTHS if m != "may") + r"|jan|feb|mar|jun|jul|aug|sept?|oct|nov|dec)"
+                    r"|(?<=in )(may)|(?<=of )(may)|(may)(?= \d{4}))\b\.?(?:\s*,?\s*(\d{4}))?", re.I)
+_YEAR = re.compile(r"\b(?:in|during|for|of) (\d{4})\b", re.I)
+_RELATIVE = re.compile(r"\b(this|last|previous) (month|year)\b", re.I)
+
+@dataclass(frozen=True)
+class QueryFilter:
+    rtypes: Optional[Tuple[str, ...]] = None   # None = every type
+    start: Optional[date] = None               # inclusive
+    end: Optional[date] = None                 # exclusive
+
+def _month(y: int, m: int) -> Tuple[date, date]:
+    return date(y, m, 1), (date(y + 1, 1, 1) if m == 12 else date(y, m + 1, 1))
+
+def parse_query(q: str, now: datetime) -> QueryFilter:
+    # Cheap structural hints from the question: which record types it is about and which calendar window.
+    types = tuple(t for rx, t in TYPE_PATTERNS if rx.search(q)) or None
+    start = end = None
+    if m := _YM.search(q):
+        if 1 <= int(m.group(2)) <= 12: start, end = _month(int(m.group(1)), int(m.group(2)))
+    elif m := _MONTH.search(q):
+        name = next(g for g in m.groups()[:4] if g).lower()
+        mon = next(i for i, full in enumerate(MONTHS, 1) if full.startswith(name[:3]))
+        if m.group(5): year = int(m.group(5))
+        else: year = now.year if mon <= now.month else now.year - 1   # bare month name: the most recent one
+        start, end = _month(year, mon)
+    elif m := _RELATIVE.search(q):
+        back = m.group(1).lower() != "this"
+        if m.group(2).lower() == "year":
+            start, end = date(now.year - back, 1, 1), date(now.year - back + 1, 1, 1)
+        else:
+            y, mon = (now.year, now.month - 1) if back else (now.year, now.month)
+            if mon == 0: y, mon = y - 1, 12
+            start, end = _month(y, mon)
+    elif m := _YEAR.search(q):
+        start, end = date(int(m.group(1)), 1, 1), date(int(m.group(1)) + 1, 1, 1)
+    return QueryFilter(types, start, end)
+
+@dataclass
+class RetrievalStats:
+    filter: QueryFilter = field(default_factory=QueryFilter)
+    candidates: int = 0      # records left after pre-filtering
+    dense: int = 0
+    bm25: int = 0
+    relaxed: bool = False    # type filter dropped because it matched nothing
+    ms: float = 0.0
+
+class HybridRetriever:
+    # Pre-filters by record type / date window, runs dense (FAISS) and lexical (BM25) search over the survivors
+    # and merges the two rankings with reciprocal-rank fusion. Returned payloads are {"rtype", "rid"}.
+    def __init__(self, store: FaissStore, corpus: Dict[str, Any], embed: Callable[[List[str]], np.ndarray],
+                 depth: int = 50, rrf_k: int = 60):
+        self.store, self.embed, self.depth, self.rrf_k = store, embed, depth, rrf_k
+        self.rtypes = [t for t in RENDERERS if corpus.get(t)]
+        self.offsets: Dict[str, Tuple[int, int]] = {}
+        self.dates: Dict[str, np.ndarray] = {}
+        n = 0
+        for t in self.rtypes:
+            rows = corpus[t]
+            self.offsets[t] = (n, n + len(rows)); n += len(rows)
+            if t in DATE_FIELDS:
+                self.dates[t] = np.array([(getattr(r, DATE_FIELDS[t]) or "")[:10] for r in rows], dtype="U10")
+        # texts are rendered as BM25 consumes them, so none is kept after it is tokenized
+        self.bm25 = BM25.build(render(t, r) for t in self.rtypes for r in corpus[t])
+        self.last = RetrievalStats()
+
+    def _ref(self, doc: int) -> Dict[str, Any]:
+        for t, (s, e) in self.offsets.items():
+            if s <= doc < e: return {"rtype": t, "rid": doc - s}
+        raise IndexError(doc)
+
+    def _row_masks(self, f: QueryFilter) -> Dict[str, Optional[np.ndarray]]:
+        # rtype -> bool mask over its rows (None = all rows); types filtered out are absent
+        out: Dict[str, Optional[np.ndarray]] = {}
+        for t in self.rtypes:
+            if f.rtypes is not None and t not in f.rtypes: continue
+            if f.start is None or t not in self.dates:
+                out[t] = None; continue
+            d = self.dates[t]
+            out[t] = (d >= f.start.isoformat()) & (d < f.end.isoformat())
+        return out
+
+    def search(self, q: str, k: int = 8, now: Optional[datetime] = None, mode: str = "hybrid",
+               flt: Optional[QueryFilter] = None) -> List[Tuple[float, Dict[str, Any]]]:
+        if mode not in RETRIEVAL_MODES: raise ValueError(f"Unknown retrieval mode: {mode}")
+        t0 = time.perf_counter()
+        flt = flt if flt is not None else parse_query(q, now or datetime.now())
+        st = RetrievalStats(filter=flt)
+        masks = self._row_masks(flt)
+        count = lambda ms: sum((self.offsets[t][1] - self.offsets[t][0]) if m is None else int(m.sum()) for t, m in ms.items())
+        st.candidates = count(masks)
+        if not st.candidates and flt.rtypes is not None:
+            masks = self._row_masks(QueryFilter(None, flt.start, flt.end)); st.relaxed = True
+            st.candidates = count(masks)
+        lists: List[List[Dict[str, Any]]] = []
+        if st.candidates:
+            unfiltered = len(masks) == len(self.rtypes) and all(m is None for m in masks.values())
+            if mode in ("hybrid", "dense"):
+                ids = None if unfiltered else np.concatenate([self.store.ids_for(t, m) for t, m in masks.items()])
+                with span("embed"): qvec = self.embed([q])
+                with span("dense_search", candidates=st.candidates):
+                    hits = self.store.search(qvec, k=self.depth if mode == "hybrid" else k, ids=ids)
+                lists.append([p for _, p in hits]); st.dense = len(hits)
+            if mode in ("hybrid", "bm25"):
+                mask = None
+                if not unfiltered:
+                    mask = np.zeros(self.bm25.n_docs, dtype=bool)
+                    for t, m in masks.items():
+                        s, e = self.offsets[t]
+                        mask[s:e] = True if m is None else m
+                with span("bm25"): hits = self.bm25.search(q, k=self.depth if mode == "hybrid" else k, mask=mask)
+                lists.append([self._ref(d) for _, d in hits]); st.bm25 = len(hits)
+        fused: Dict[Tuple[str, int], float] = {}
+        for ranked in lists:
+            for rank, p in enumerate(ranked):
+                key = (p["rtype"], p["rid"])
+                fused[key] = fused.get(key, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        out = sorted(fused.items(), key=lambda kv: (-kv[1], kv[0]))[:k]
+        st.ms = (time.perf_counter() - t0) * 1000
+        self.last = st
+        return [(score, {"rtype": t, "rid": rid}) for (t, rid), score in out]
@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from pydantic.dataclasses import dataclass
 from typing import Optional, List
 
 class Agreement(BaseModel):
@@ -17,7 +18,9 @@ class Agreement(BaseModel):
     rounding: str = "sum_then_round"
     tz: str = "America/New_York"
 
-class AccountSummary(BaseModel):
+# Corpus rows are slotted, frozen dataclasses: validated once, ~half the heap of a dict, read-only.
+@dataclass(slots=True, frozen=True, kw_only=True)
+class AccountSummary:
     accountId: str
     creditLimit: float
     availableCredit: Optional[float] = None
@@ -28,7 +31,8 @@ class AccountSummary(BaseModel):
     billingCycleOpenDateTime: Optional[str] = None
     billingCycleCloseDateTime: Optional[str] = None
 
-class Statement(BaseModel):
+@dataclass(slots=True, frozen=True, kw_only=True)
+class Statement:
     statementId: str
     openingDateTime: str
     closingDateTime: str
@@ -40,7 +44,8 @@ class Statement(BaseModel):
     minimumPaymentDue: Optional[float] = 0.0
     unpaidBalance: Optional[float] = 0.0
 
-class Payment(BaseModel):
+@dataclass(slots=True, frozen=True, kw_only=True)
+class Payment:
     paymentId: str
     state: str
     paymentDateTime: str
@@ -48,7 +53,8 @@ class Payment(BaseModel):
     amount: float
     fundingSource: Optional[list] = None
 
-class Transaction(BaseModel):
+@dataclass(slots=True, frozen=True, kw_only=True)
+class Transaction:
     transactionId: str
     transactionType: str
     transactionStatus: str
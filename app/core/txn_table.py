@@ -0,0 +1,94 @@
+from __future__ import annotations
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.core.schemas import Transaction
+
+DEBIT_TYPES = {"PURCHASE","FEE","INTEREST","CASH_ADVANCE","BALANCE_TRANSFER"}  # increase the balance owed
+
+def _epoch_seconds(stamps: Sequence[str]) -> np.ndarray:
+    # ISO-8601 -> int64 UTC epoch seconds. "...Z" stamps (the common case) parse vectorised; others via fromisoformat.
+    out = np.empty(len(stamps), dtype="int64")
+    z = np.fromiter((s.endswith("Z") for s in stamps), dtype=bool, count=len(stamps))
+    if z.any():
+        zs = np.asarray([s[:-1] for s, is_z in zip(stamps, z) if is_z])
+        out[z] = np.floor(zs.astype("datetime64[us]").astype("int64") / 1_000_000).astype("int64")
+    for i in np.flatnonzero(~z):
+        dt = datetime.fromisoformat(stamps[i])
+        if dt.tzinfo is None: dt = dt.replace(tzinfo=timezone.utc)
+        out[i] = int(np.floor(dt.timestamp()))
+    return out
+
+def _cents(vals) -> np.ndarray:
+    return np.round(np.asarray(vals, dtype="float64") * 100).astype("int64")
+
+class TransactionTable:
+    # Columnar, time-sorted view of the transactions, built once at load time.
+    # ts: int64 UTC epoch seconds; type/status: int8 codes into self.types/self.statuses;
+    # amount/ending: int64 cents; row: index into the source record list (for evidence).
+    def __init__(self, ts, type_code, status_code, amount, ending, row, types, statuses, source):
+        self.ts, self.type_code, self.status_code = ts, type_code, status_code
+        self.amount, self.ending, self.row = amount, ending, row
+        self.types: List[str] = types
+        self.statuses: List[str] = statuses
+        self.source: Sequence[Transaction] = source
+        self._cat: Dict[Tuple[int, int], Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self._posted: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None
+
+    def __len__(self): return len(self.ts)
+
+    @classmethod
+    def from_records(cls, txs: Sequence[Transaction]) -> "TransactionTable":
+        n = len(txs)
+        types = sorted({(t.transactionType or "").upper() for t in txs})
+        statuses = sorted({(t.transactionStatus or "").upper() for t in txs})
+        tmap, smap = {v: i for i, v in enumerate(types)}, {v: i for i, v in enumerate(statuses)}
+        ts = _epoch_seconds([t.transactionDateTime for t in txs])
+        order = np.argsort(ts, kind="stable")
+        def col(vals, dtype): return np.fromiter(vals, dtype=dtype, count=n)[order]
+        return cls(
+            ts=ts[order],
+            type_code=col((tmap[(t.transactionType or "").upper()] for t in txs), "int8"),
+            status_code=col((smap[(t.transactionStatus or "").upper()] for t in txs), "int8"),
+            amount=_cents(col((t.amount for t in txs), "float64")),
+            ending=_cents(col((t.endingBalance or 0.0 for t in txs), "float64")),
+            row=order.astype("int64"), types=types, statuses=statuses, source=txs,
+        )
+
+    @classmethod
+    def of(cls, txs) -> "TransactionTable":
+        return txs if isinstance(txs, cls) else cls.from_records(txs)
+
+    def code(self, vocab: List[str], value: str) -> int:
+        value = value.upper()
+        return vocab.index(value) if value in vocab else -1
+
+    def _category(self, typ: str, status: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # positions of one (type, status) category, their sorted timestamps and amount prefix sums, cached per category
+        key = (self.code(self.types, typ), self.code(self.statuses, status))
+        if key not in self._cat:
+            pos = np.flatnonzero((self.type_code == key[0]) & (self.status_code == key[1])) if -1 not in key \
+                  else np.zeros(0, dtype="int64")
+            self._cat[key] = (pos, self.ts[pos], np.concatenate(([0], np.cumsum(self.amount[pos]))))
+        return self._cat[key]
+
+    def window(self, typ: str, status: str, start: Optional[datetime] = None, end: Optional[datetime] = None):
+        # -> (positions in [start, end), total cents); O(log n) after the first call per category
+        pos, cts, cum = self._category(typ, status)
+        lo, hi = 0, len(pos)
+        if start is not None:
+            lo = int(np.searchsorted(cts, int(start.timestamp()), "left"))
+            hi = int(np.searchsorted(cts, int(np.ceil(end.timestamp())), "left"))
+        return pos[lo:hi], int(cum[hi] - cum[lo])
+
+    def posted(self):
+        # POSTED events only: (ts, signed delta cents, ending cents, delta prefix sums), cached
+        if self._posted is None:
+            m = self.status_code == self.code(self.statuses, "POSTED")
+            sign = np.array([1 if t in DEBIT_TYPES else -1 for t in self.types], dtype="int64")
+            delta = self.amount[m] * (sign[self.type_code[m]] if len(sign) else 0)
+            self._posted = (self.ts[m], delta, self.ending[m], np.concatenate(([0], np.cumsum(delta))))
+        return self._posted
+
+    def record(self, pos: int) -> Transaction:
+        return self.source[int(self.row[pos])]
@@ -0,0 +1,100 @@
+"""Headless HTTP API around ChatController.
+
+    uvicorn app.server:api --host 0.0.0.0 --port 8000
+
+One process holds one preloaded SharedData snapshot (corpus, index, router). Retrieval, embedding and the
+interest engine run on a bounded thread pool (API_WORKERS); LLM calls are awaited on the event loop through
+AsyncLLMService, so waiting on the model never ties up a worker. Scale out with more processes behind a balancer.
+"""
+import os, re, asyncio, contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+from app.controllers.chat_controller import ChatController, SYSTEM
+from app.core.schemas import Agreement
+from app.services.interest_calc import monthly_interest
+from app.services.llm_service import AsyncLLMService
+from app.services.metrics import total_interest_all, total_interest_year, total_interest_month
+from app.services.shared_data import SharedData
+from app.utils.now import now_utc
+from app.utils.tracing import TRACER, span, trace
+
+DATA_DIR = os.getenv("DATA_DIR", "./data")
+API_WORKERS = int(os.getenv("API_WORKERS", str(min(8, os.cpu_count() or 1))))   # CPU-side threads
+
+class AnswerRequest(BaseModel):
+    question: str
+
+class _State:
+    shared: SharedData
+    pool: ThreadPoolExecutor
+    llm: AsyncLLMService
+
+state = _State()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    state.pool = ThreadPoolExecutor(max_workers=API_WORKERS, thread_name_prefix="api-cpu")
+    loop = asyncio.get_running_loop()
+    state.shared = await loop.run_in_executor(state.pool, SharedData, DATA_DIR)   # index is ready before serving
+    state.llm = AsyncLLMService()
+    try:
+        yield
+    finally:
+        await state.llm.aclose()
+        state.pool.shutdown(wait=False, cancel_futures=True)
+
+api = FastAPI(title="Banking Co-Pilot API", lifespan=lifespan)
+
+async def _cpu(fn, *args):
+    # copy the context so spans recorded in the worker attach to this request's trace
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(state.pool, ctx.run, fn, *args)
+
+@api.get("/healthz")
+async def healthz() -> Dict[str, Any]:
+    snap = state.shared.current()
+    return {"status": "ok", "snapshot": snap.version, "vectors": len(snap.store), "workers": API_WORKERS,
+            "router": snap.router.stats(), "reload_error": state.shared.last_error, "llm_cache": await state.llm.acache_stats()}
+
+@api.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> str:
+    return TRACER.prometheus_text()
+
+@api.post("/v1/answer")
+async def answer(req: AnswerRequest) -> Dict[str, Any]:
+    q = req.question.strip()
+    if not q: raise HTTPException(400, "question is empty")
+    ctrl = ChatController(shared=state.shared)   # stateless per request; the snapshot is shared
+    with trace("answer"):
+        snap, sc, snippets, prelude = await _cpu(ctrl.prepare, q)
+        if sc: return sc
+        with span("llm"): result = await state.llm.ask(SYSTEM, prelude)
+        return await _cpu(ctrl.finalize, snap, q, result, snippets)
+
+@api.get("/v1/interest/total")
+async def total_interest(window: str = "all") -> Dict[str, Any]:
+    fns = {"all": lambda t: total_interest_all(t), "year": lambda t: total_interest_year(t, now_utc()),
+           "month": lambda t: total_interest_month(t, now_utc())}
+    if window not in fns: raise HTTPException(400, f"window must be one of {sorted(fns)}")
+    total, ev = await _cpu(fns[window], state.shared.current().txns)
+    return {"window": window, "total": total,
+            "evidence": [{"transactionId": tid, "amount": amt, "transactionDateTime": dt} for tid, amt, dt in ev]}
+
+@api.get("/v1/interest/month/{ym}")
+async def month_interest(ym: str, apr: Optional[float] = None) -> Dict[str, Any]:
+    if not re.fullmatch(r"\d{4}-(0[1-9]|1[0-2])", ym): raise HTTPException(400, "period must be YYYY-MM")
+    snap = state.shared.current()
+    acc = snap.corpus.get("account_summary") or []
+    if apr is None:
+        apr = (snap.agreement.purchaseApr if snap.agreement and snap.agreement.purchaseApr is not None
+               else (acc[0].purchaseApr if acc and acc[0].purchaseApr is not None else None))
+    if apr is None: raise HTTPException(422, "no purchase APR in agreement or account summary; pass ?apr=")
+    res = await _cpu(monthly_interest, snap.txns, [ym], snap.agreement, {"purchaseApr": apr})
+    if not res: raise HTTPException(404, "No posted transactions to build daily balances.")
+    ag = snap.agreement or Agreement()
+    return {"period": ym, "interest": res[ym]["purchaseApr"], "apr": apr, "basis": ag.apr_basis,
+            "rounding": ag.rounding, "tz": ag.tz}
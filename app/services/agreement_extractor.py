@@ -1,5 +1,7 @@
-import os, json, hashlib, re
-from typing import Optional
+import os, json, hashlib, re, time, threading
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from PyPDF2 import PdfReader
 from app.core.schemas import Agreement
 
@@ -7,35 +9,86 @@ PDF_PATH = "./data/agreement.pdf"
 JSON_PATH = "./data/agreement.json"
 META_PATH = "./data/agreement.meta.json"
 
-def _pdf_text(path: str) -> str:
-    reader = PdfReader(path)
-    return "\n".join((p.extract_text() or "") for p in reader.pages)
+AGREEMENT_WORKERS = int(os.getenv("AGREEMENT_WORKERS", "0"))             # page-extraction processes; 0 = min(4, cpus)
+AGREEMENT_PARALLEL_PAGES = int(os.getenv("AGREEMENT_PARALLEL_PAGES", "48"))  # below this, pages are read in-process (spawn costs ~0.5s)
+AGREEMENT_PAGE_CHUNK = int(os.getenv("AGREEMENT_PAGE_CHUNK", "4"))       # pages per worker task
+
+_PCT = r"[^0-9]{0,40}?)(\d{1,2}\.\d{2})\s*%"
+APR_PATTERNS = {
+    "purchaseApr": re.compile(r"(?:Purchase\s+APR" + _PCT, re.I),
+    "cashAdvanceApr": re.compile(r"(?:Cash\s+Advance\s+APR" + _PCT, re.I),
+    "balanceTransferApr": re.compile(r"(?:Balance\s+Transfer\s+APR" + _PCT, re.I),
+    "penaltyApr": re.compile(r"(?:Penalty\s+APR" + _PCT, re.I),
+}
+APR_RANGE = re.compile(r"(?:APRs?|Purchase APRs?).{0,40}range\s+from\s+(\d{1,2}\.\d{2})\s*%\s+to\s+(\d{1,2}\.\d{2})\s*%", re.I)
 
 def _sha256(path: str) -> str:
-    import hashlib
     h = hashlib.sha256()
     with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(65536), b""):
+        for chunk in iter(lambda: f.read(1 << 20), b""):
             h.update(chunk)
     return h.hexdigest()
 
+def _stat(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        s = os.stat(path); return s.st_size, s.st_mtime_ns
+    except FileNotFoundError:
+        return None
+
 def _clean_pct(s: str) -> float:
     return float(s.strip().replace("%",""))
 
 def _parse_aprs(txt: str):
-    out = {"purchaseApr": None, "cashAdvanceApr": None, "balanceTransferApr": None, "penaltyApr": None}
-    m = re.search(r"(?:Purchase\s+APR[^0-9]{0,40}?)(\d{1,2}\.\d{2})\s*%", txt, re.I)
-    if m: out["purchaseApr"] = _clean_pct(m.group(1))
-    m = re.search(r"(?:Cash\s+Advance\s+APR[^0-9]{0,40}?)(\d{1,2}\.\d{2})\s*%", txt, re.I)
-    if m: out["cashAdvanceApr"] = _clean_pct(m.group(1))
-    m = re.search(r"(?:Balance\s+Transfer\s+APR[^0-9]{0,40}?)(\d{1,2}\.\d{2})\s*%", txt, re.I)
-    if m: out["balanceTransferApr"] = _clean_pct(m.group(1))
-    m = re.search(r"(?:Penalty\s+APR[^0-9]{0,40}?)(\d{1,2}\.\d{2})\s*%", txt, re.I)
-    if m: out["penaltyApr"] = _clean_pct(m.group(1))
-    rng = re.search(r"(?:APRs?|Purchase APRs?).{0,40}range\s+from\s+(\d{1,2}\.\d{2})\s*%\s+to\s+(\d{1,2}\.\d{2})\s*%", txt, re.I)
+    out: Dict[str, Optional[float]] = {}
+    for field, pat in APR_PATTERNS.items():
+        m = pat.search(txt)
+        out[field] = _clean_pct(m.group(1)) if m else None
+    rng = APR_RANGE.search(txt)
     return out, (rng.group(1), rng.group(2)) if rng else None
 
-def _infer_defaults_from_text(txt: str) -> Agreement:
+def _page_texts(path: str, start: int, end: int) -> List[str]:
+    reader = PdfReader(path)
+    return [(reader.pages[i].extract_text() or "") for i in range(start, end)]
+
+def _iter_pages(path: str, workers: int) -> Iterator[str]:
+    # Page texts in order. Long PDFs are split into page chunks across processes; closing the generator early
+    # cancels chunks that have not started.
+    reader = PdfReader(path)
+    n = len(reader.pages)
+    if workers <= 1 or n < AGREEMENT_PARALLEL_PAGES:
+        for p in reader.pages: yield p.extract_text() or ""
+        return
+    chunk = max(1, AGREEMENT_PAGE_CHUNK)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as ex:
+        futs = [ex.submit(_page_texts, path, s, min(n, s + chunk)) for s in range(0, n, chunk)]
+        try:
+            for f in futs: yield from f.result()
+        finally:
+            for f in futs: f.cancel()
+
+def extract_agreement(path: str, workers: Optional[int] = None) -> Tuple[Agreement, Dict[str, Any]]:
+    # -> (Agreement, info). Stops reading pages once every APR field and the purchase APR range have matched; a
+    # pattern may straddle a page break, so each new page is checked together with the previous one.
+    t0 = time.perf_counter()
+    workers = workers if workers is not None else (AGREEMENT_WORKERS or min(4, os.cpu_count() or 1))
+    texts: List[str] = []
+    missing, want_range = set(APR_PATTERNS), True
+    pages = _iter_pages(path, workers)
+    try:
+        for page in pages:
+            texts.append(page)
+            window = "\n".join(texts[-2:])
+            missing = {f for f in missing if not APR_PATTERNS[f].search(window)}
+            want_range = want_range and not APR_RANGE.search(window)
+            if not missing and not want_range: break
+    finally:
+        pages.close()
+    ag, rng = _infer_defaults_from_text("\n".join(texts))
+    info = {"pages_read": len(texts), "early_stop": not missing and not want_range, "seconds": round(time.perf_counter() - t0, 4),
+            "apr_range": rng}
+    return ag, info
+
+def _infer_defaults_from_text(txt: str) -> Tuple[Agreement, Optional[Tuple[str, str]]]:
     aprs, rng = _parse_aprs(txt)
     ag = Agreement(
         purchaseApr=aprs.get("purchaseApr"),
@@ -49,27 +102,88 @@ def _infer_defaults_from_text(txt: str) -> Agreement:
         rounding="sum_then_round",
         tz="America/New_York",
     )
-    ag.__dict__["_apr_range_detected"] = rng
-    return ag
+    return ag, rng
 
-def ensure_agreement_json() -> Optional[Agreement]:
-    if not os.path.exists(PDF_PATH):
-        if os.path.exists(JSON_PATH):
-            return Agreement(**json.load(open(JSON_PATH)))
+def _write_json(path: str, obj: Dict[str, Any]):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f: json.dump(obj, f, indent=2)
+    os.replace(tmp, path)
+
+# (pdf stat, json stat) -> Agreement, per json path; lets reruns skip every file read while nothing changed
+_memo: Dict[str, Tuple[Tuple, Agreement]] = {}
+_memo_lock = threading.Lock()
+
+def ensure_agreement_json(pdf_path: str = PDF_PATH, json_path: str = JSON_PATH, meta_path: str = META_PATH,
+                          workers: Optional[int] = None) -> Optional[Agreement]:
+    # Returns the Agreement for pdf_path, re-extracting only when the PDF content changed. Change detection is
+    # size+mtime first; the SHA-256 is computed only when those differ from the recorded ones. The returned
+    # Agreement is shared in-process; treat it as read-only.
+    pdf_st, json_st = _stat(pdf_path), _stat(json_path)
+    key = (pdf_st, json_st)
+    hit = _memo.get(json_path)
+    if hit is not None and hit[0] == key: return hit[1]
+    with _memo_lock:
+        ag = _ensure(pdf_path, json_path, meta_path, pdf_st, json_st, workers)
+        if ag is not None: _memo[json_path] = ((pdf_st, _stat(json_path)), ag)
+        else: _memo.pop(json_path, None)
+        return ag
+
+def _ensure(pdf_path: str, json_path: str, meta_path: str, pdf_st, json_st, workers) -> Optional[Agreement]:
+    if pdf_st is None:
+        if json_st is not None:
+            with open(json_path) as f: return Agreement(**json.load(f))
         return None
-    pdf_hash = _sha256(PDF_PATH)
-    meta = {}
-    if os.path.exists(META_PATH):
-        try: meta = json.load(open(META_PATH))
+    meta: Dict[str, Any] = {}
+    if os.path.exists(meta_path):
+        try:
+            with open(meta_path) as f: meta = json.load(f)
         except Exception: meta = {}
-    needs = (meta.get("pdf_sha256") != pdf_hash) or (not os.path.exists(JSON_PATH))
-    if needs:
-        txt = _pdf_text(PDF_PATH)
-        ag = _infer_defaults_from_text(txt)
-        with open(JSON_PATH, "w") as f: json.dump(ag.model_dump(), f, indent=2)
-        m = {"pdf_sha256": pdf_hash}
-        rng = ag.__dict__.get("_apr_range_detected")
-        if rng: m["purchaseAprRange"] = {"low": float(rng[0]), "high": float(rng[1])}
-        with open(META_PATH, "w") as f: json.dump(m, f, indent=2)
-        return ag
-    return Agreement(**json.load(open(JSON_PATH)))
+    digest = None
+    if json_st is not None and meta.get("pdf_sha256"):
+        same_file = meta.get("pdf_size") == pdf_st[0] and meta.get("pdf_mtime_ns") == pdf_st[1]
+        if not same_file:
+            digest = _sha256(pdf_path)
+            same_file = meta["pdf_sha256"] == digest
+            if same_file:   # touched or copied but identical: remember the new stat so the next check is free
+                meta.update(pdf_size=pdf_st[0], pdf_mtime_ns=pdf_st[1]); _write_json(meta_path, meta)
+        if same_file:
+            with open(json_path) as f: return Agreement(**json.load(f))
+    ag, info = extract_agreement(pdf_path, workers)
+    _write_json(json_path, ag.model_dump())
+    m: Dict[str, Any] = {"pdf_sha256": digest or _sha256(pdf_path), "pdf_size": pdf_st[0], "pdf_mtime_ns": pdf_st[1],
+                         "pages_read": info["pages_read"], "extract_seconds": info["seconds"]}
+    rng = info["apr_range"]
+    if rng: m["purchaseAprRange"] = {"low": float(rng[0]), "high": float(rng[1])}
+    _write_json(meta_path, m)
+    return ag
+
+def _extract_one(args: Tuple[str, str]) -> Dict[str, Any]:
+    pdf, out_dir = args
+    stem = os.path.splitext(os.path.basename(pdf))[0]
+    base = os.path.join(out_dir or os.path.dirname(pdf), stem)
+    t0 = time.perf_counter()
+    out: Dict[str, Any] = {"file": pdf, "json": base + ".agreement.json", "error": None}
+    try:
+        ag = ensure_agreement_json(pdf, base + ".agreement.json", base + ".agreement.meta.json", workers=1)
+        out["aprs"] = {f: getattr(ag, f) for f in APR_PATTERNS}
+    except Exception as e:
+        out["error"] = f"{type(e).__name__}: {e}"
+    out["seconds"] = round(time.perf_counter() - t0, 4)
+    return out
+
+def iter_agreement_pdfs(root: str) -> Iterator[str]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for fn in sorted(filenames):
+            if fn.lower().endswith(".pdf"): yield os.path.join(dirpath, fn)
+
+def extract_dir(root: str, out_dir: Optional[str] = None, workers: int = 0, chunksize: int = 8) -> Iterator[Dict[str, Any]]:
+    # Bulk mode: one task per PDF across a process pool (pages within a file are read sequentially there).
+    # Yields per-file results with timing as they finish; unchanged PDFs are skipped via their meta files.
+    if out_dir: os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    tasks = ((p, out_dir) for p in iter_agreement_pdfs(root))
+    if workers == 1:
+        yield from map(_extract_one, tasks); return
+    with mp.get_context("spawn").Pool(workers) as pool:
+        yield from pool.imap_unordered(_extract_one, tasks, chunksize=chunksize)
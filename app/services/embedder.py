@@ -1,13 +1,99 @@
-import os, numpy as np
-from typing import List
+import os, hashlib, numpy as np, multiprocessing as mp
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 from sentence_transformers import SentenceTransformer
+from app.utils.cache import LRUCache, SqliteCache
 
 _model = None
+_disk = None
 
-def embed_texts(texts: List[str]) -> np.ndarray:
+# Two-tier cache: in-memory LRU in front of a sqlite store, keyed by sha1(model + text).
+_mem = LRUCache(int(os.getenv("EMBED_CACHE_MEM_ITEMS", "50000")))
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "./data/.cache/embeddings.sqlite")
+EMBED_CACHE_DISK_ITEMS = int(os.getenv("EMBED_CACHE_DISK_ITEMS", "2000000"))
+_encoded = 0
+
+# Reindexing: texts per encode call and worker processes (0 = encode in this process).
+EMBED_BATCH = int(os.getenv("EMBED_BATCH", "1024"))
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "0"))
+
+def model_name() -> str:
+    return os.getenv("LOCAL_EMBED_MODEL", "all-MiniLM-L6-v2")
+
+def _get_model():
     global _model
     if _model is None:
-        name = os.getenv("LOCAL_EMBED_MODEL", "all-MiniLM-L6-v2")
-        _model = SentenceTransformer(name)
-    embs = _model.encode(texts, normalize_embeddings=False, convert_to_numpy=True, show_progress_bar=False)
+        _model = SentenceTransformer(model_name())
+    return _model
+
+def _disk_cache():
+    global _disk
+    if _disk is None and EMBED_CACHE_PATH:
+        _disk = SqliteCache(EMBED_CACHE_PATH, max_items=EMBED_CACHE_DISK_ITEMS, table="embeddings")
+    return _disk
+
+def embedding_dim() -> int:
+    return int(_get_model().get_sentence_embedding_dimension())
+
+def _key(model: str, text: str) -> str:
+    return hashlib.sha1(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+def _encode(texts: List[str]) -> np.ndarray:
+    global _encoded
+    _encoded += len(texts)
+    embs = _get_model().encode(texts, normalize_embeddings=False, convert_to_numpy=True, show_progress_bar=False)
     return embs.astype("float32")
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    if not texts:
+        return np.zeros((0, embedding_dim()), dtype="float32")
+    model = model_name()
+    keys = [_key(model, t) for t in texts]
+    out: List[Any] = [_mem.get(k) for k in keys]
+    miss = [i for i, v in enumerate(out) if v is None]
+    disk = _disk_cache()
+    if miss and disk is not None:
+        found = disk.get_many(keys[i] for i in miss)
+        for i in miss:
+            b = found.get(keys[i])
+            if b is not None:
+                out[i] = np.frombuffer(b, dtype="float32"); _mem.put(keys[i], out[i])
+        miss = [i for i in miss if out[i] is None]
+    if miss:
+        todo = list(dict.fromkeys(keys[i] for i in miss))  # identical texts in one batch are encoded once
+        first = {}
+        for i in miss: first.setdefault(keys[i], i)
+        embs = _encode([texts[first[k]] for k in todo])
+        fresh = dict(zip(todo, embs))
+        for k, v in fresh.items(): _mem.put(k, v)
+        if disk is not None: disk.put_many({k: v.tobytes() for k, v in fresh.items()})
+        for i in miss: out[i] = fresh[keys[i]]
+    return np.stack(out).astype("float32", copy=False)
+
+def _init_worker(threads: int):
+    try:
+        import torch
+        torch.set_num_threads(threads)  # avoid N workers x all-cores intra-op threads
+    except Exception:
+        pass
+
+def embed_batches(batches: Iterable[List[str]], workers: Optional[int] = None) -> Iterator[np.ndarray]:
+    # Yields one embedding matrix per input batch, in order. With workers > 0 batches are encoded in a
+    # process pool with at most 2*workers batches in flight, so memory stays bounded for any corpus size.
+    workers = EMBED_WORKERS if workers is None else workers
+    if workers <= 0:
+        for b in batches: yield embed_texts(b)
+        return
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    with ProcessPoolExecutor(workers, mp_context=mp.get_context("spawn"), initializer=_init_worker,
+                             initargs=(threads,)) as ex:
+        inflight = deque()
+        for b in batches:
+            inflight.append(ex.submit(embed_texts, b))
+            if len(inflight) >= 2 * workers: yield inflight.popleft().result()
+        while inflight: yield inflight.popleft().result()
+
+def cache_stats() -> Dict[str, Any]:
+    disk = _disk_cache()
+    return {"memory": _mem.stats(), "disk": disk.stats() if disk is not None else None, "encoded": _encoded}
@@ -0,0 +1,40 @@
+import os
+from typing import Any, Dict, Iterable, Iterator, Tuple
+from app.core.rag.documents import render
+from app.core.rag.faiss_store import FaissStore, index_config_from_env
+from app.services.embedder import embed_batches, embedding_dim, model_name, EMBED_BATCH
+
+# On-disk FAISS index + payload sidecar; set INDEX_DIR="" to always rebuild in memory.
+INDEX_DIR = os.getenv("INDEX_DIR", "./data/.index")
+DOC_TYPES = {
+    "account_summary": "accountId",
+    "statements": "statementId",
+    "payments": "paymentId",
+    "transactions": "transactionId",
+}
+
+def corpus_records(corpus: Dict[str, Any]) -> Iterator[Tuple[str, int, Any]]:
+    for rtype in DOC_TYPES:
+        for i, r in enumerate(corpus.get(rtype, [])):
+            yield rtype, i, r
+
+def index_items(records: Iterable[Tuple[str, int, Any]]) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    # (rtype, i, record) -> (stable key, embedding text, payload) for FaissStore.sync. The payload only points
+    # back at the source row; snippet text is re-rendered from it for the hits that are used.
+    seen = set()
+    for rtype, i, r in records:
+        key = f"{rtype}:{getattr(r, DOC_TYPES[rtype], None) or i}"
+        if key in seen: key = f"{key}#{i}"
+        seen.add(key)
+        yield key, render(rtype, r), {"rtype":rtype,"rid":i}
+
+def sync_index(records: Iterable[Tuple[str, int, Any]], index_dir: str = INDEX_DIR, batch_size: int = EMBED_BATCH,
+               workers: int | None = None) -> Tuple[FaissStore, Dict[str, int]]:
+    # Loads the persisted index (if compatible), streams records through it in embedding batches, saves on change.
+    meta, cfg = {"model": model_name()}, index_config_from_env()
+    store = (FaissStore.load(index_dir, meta=meta, config=cfg) if index_dir else None) or FaissStore(embedding_dim(), meta, cfg)
+    stats = store.sync(index_items(records), batch_size=batch_size,
+                       embed_batches=lambda bs: embed_batches(bs, workers=workers))
+    if index_dir and (stats["added"] or stats["updated"] or stats["removed"]):
+        store.save(index_dir)
+    return store, stats
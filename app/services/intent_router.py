@@ -0,0 +1,152 @@
+from __future__ import annotations
+import re, time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+from app.core.schemas import Agreement
+from app.core.txn_table import TransactionTable
+from app.services.metrics import TOTAL_PATTERNS, total_interest_all, total_interest_year, total_interest_month
+
+# Questions the data answers directly never reach retrieval or the LLM. Patterns are compiled once and tried in
+# order; "why/explain" questions always fall through because they need the narrative answer.
+_EXPLAIN = re.compile(r"^\s*(why|how come|explain)\b", re.I)
+INTENT_PATTERNS = [
+    ("scheduled_payments", re.compile(r"\b(scheduled|upcoming|future|pending) payments?\b|\bautopay\b|\bpayments? (are |is )?scheduled\b", re.I)),
+    ("last_payment", re.compile(r"\b(last|latest|most recent|previous) payment\b|\bwhen did i (last )?pay\b", re.I)),
+    ("minimum_payment", re.compile(r"\bmin(imum)? (payment|amount|due)\b|\bminimum (i|to) pay\b", re.I)),
+    ("current_balance", re.compile(r"\b(current|outstanding) balance\b|\bhow much do i owe\b", re.I)),
+]
+
+def _money(v: float) -> str:
+    return f"${v:,.2f}"
+
+def _day(ts: Optional[str]) -> str:
+    return ts[:10] if ts else "n/a"
+
+def _source(p) -> str:
+    src = [s for s in (p.fundingSource or []) if isinstance(s, dict)]
+    return f" from {src[0].get('fundingType', 'account')} ending {src[0].get('last4Account', '????')}" if src else ""
+
+class IntentRouter:
+    # Built once per corpus: the few records these intents need are pre-sorted here so answering is a lookup.
+    def __init__(self, corpus: Dict[str, Any], agreement: Optional[Agreement], txns: Optional[TransactionTable] = None):
+        self.agreement = agreement
+        self.txns = txns if txns is not None else TransactionTable.from_records(corpus.get("transactions", []))
+        acc = corpus.get("account_summary") or []
+        self.account = acc[0] if acc else None
+        pays = sorted(corpus.get("payments") or [], key=lambda p: p.paymentDateTime or "")
+        self.posted = [p for p in pays if p.state == "POSTED"]
+        self.scheduled = sorted((p for p in pays if p.state == "SCHEDULED"),
+                                key=lambda p: p.effectiveDateTime or p.paymentDateTime or "")
+        stmts = sorted(corpus.get("statements") or [], key=lambda s: s.closingDateTime or "")
+        self.statement = stmts[-1] if stmts else None
+        posted = [t for t in corpus.get("transactions") or [] if t.transactionStatus == "POSTED" and t.endingBalance is not None]
+        self.last_txn = max(posted, key=lambda t: t.transactionDateTime) if posted else None
+        self.handlers: Dict[str, Callable[[str, datetime], Optional[Dict[str, Any]]]] = {
+            "total_interest": self._total_interest, "scheduled_payments": self._scheduled_payments,
+            "last_payment": self._last_payment, "minimum_payment": self._minimum_payment,
+            "current_balance": self._current_balance,
+        }
+        self.hits: Dict[str, int] = {name: 0 for name in self.handlers}
+        self.fallthrough = 0
+        self.route_ns = 0
+        self.routed_calls = 0
+
+    def detect(self, q: str) -> Optional[str]:
+        if _EXPLAIN.search(q): return None
+        for pat, _ in TOTAL_PATTERNS:
+            if pat.search(q): return "total_interest"
+        for name, pat in INTENT_PATTERNS:
+            if pat.search(q): return name
+        return None
+
+    def route(self, q: str, now: datetime) -> Optional[Dict[str, Any]]:
+        # -> answer dict (answer, used_fields, notes, evidence_lines, intent) or None to use retrieval + LLM
+        t0 = time.perf_counter_ns()
+        intent = self.detect(q)
+        out = self.handlers[intent](q, now) if intent else None
+        self.route_ns += time.perf_counter_ns() - t0; self.routed_calls += 1
+        if out is None:
+            self.fallthrough += 1; return None
+        self.hits[intent] += 1
+        out["intent"] = intent
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        routed = sum(self.hits.values())
+        return {"hits": dict(self.hits), "fallthrough": self.fallthrough,
+                "hit_rate": routed / self.routed_calls if self.routed_calls else 0.0,
+                "avg_route_us": self.route_ns / self.routed_calls / 1000 if self.routed_calls else 0.0}
+
+    def _total_interest(self, q: str, now: datetime):
+        kind = next(k for pat, k in TOTAL_PATTERNS if pat.search(q))
+        if kind == "all":
+            total, ev = total_interest_all(self.txns); label = "Total interest"
+        elif kind == "year":
+            total, ev = total_interest_year(self.txns, now); label = "Total interest this year"
+        else:
+            total, ev = total_interest_month(self.txns, now); label = "Total interest this month"
+        ev_lines = [f"{tid or '(no-id)'} · {dt} · ${amt:.2f}" for (tid, amt, dt) in ev]
+        return {"answer": f"{label} is ${total:.2f}.", "used_fields":["transactions[POSTED.INTEREST].*"],
+                "notes":"Sum of POSTED INTEREST in window.", "evidence_lines": ev_lines}
+
+    def _current_balance(self, q: str, now: datetime):
+        a = self.account
+        if a is None or a.currentBalance is None: return None
+        ans = f"Your current balance is {_money(a.currentBalance)}."
+        if a.availableCredit is not None:
+            ans += f" Available credit is {_money(a.availableCredit)} of your {_money(a.creditLimit)} limit."
+        ev = [f"{a.accountId} · currentBalance · {_money(a.currentBalance)}"]
+        last = self.last_txn
+        if last is not None:
+            ev.append(f"{last.transactionId} · {last.transactionDateTime} · ending balance {_money(last.endingBalance)}")
+        return {"answer": ans, "used_fields": ["account_summary.currentBalance", "account_summary.availableCredit",
+                                               "account_summary.creditLimit"],
+                "notes": "From the account summary; latest POSTED transaction shown for reference.", "evidence_lines": ev}
+
+    def _last_payment(self, q: str, now: datetime):
+        cutoff = now.strftime("%Y-%m-%dT%H:%M:%S")
+        done = [p for p in self.posted if (p.paymentDateTime or "")[:19] <= cutoff]
+        if not done:
+            return {"answer": "No matching data found.", "used_fields": ["payments[POSTED].*"],
+                    "notes": "No POSTED payments on file.", "evidence_lines": []}
+        p = done[-1]
+        return {"answer": f"Your last payment was {_money(p.amount)} on {_day(p.paymentDateTime)}{_source(p)}.",
+                "used_fields": ["payments[POSTED].paymentDateTime", "payments[POSTED].amount", "payments.fundingSource"],
+                "notes": "Most recent POSTED payment.",
+                "evidence_lines": [f"{p.paymentId} · {p.paymentDateTime} · {_money(p.amount)}"]}
+
+    def _scheduled_payments(self, q: str, now: datetime):
+        if not self.scheduled:
+            return {"answer": "There are no scheduled payments.", "used_fields": ["payments[SCHEDULED].*"],
+                    "notes": "No payments in SCHEDULED state.", "evidence_lines": []}
+        n = len(self.scheduled)
+        items = "; ".join(f"{_money(p.amount)} on {_day(p.effectiveDateTime or p.paymentDateTime)}{_source(p)}"
+                          for p in self.scheduled)
+        return {"answer": f"You have {n} scheduled payment{'s' if n != 1 else ''}: {items}.",
+                "used_fields": ["payments[SCHEDULED].effectiveDateTime", "payments[SCHEDULED].amount"],
+                "notes": "Payments in SCHEDULED state, by effective date.",
+                "evidence_lines": [f"{p.paymentId} · {p.effectiveDateTime or p.paymentDateTime} · {_money(p.amount)}"
+                                   for p in self.scheduled]}
+
+    def _minimum_payment(self, q: str, now: datetime):
+        # Agreement first: max(floor, percent × statement balance), capped at the balance; else the statement's figure.
+        st, a = self.statement, self.account
+        bal = a.statementBalance if a is not None and a.statementBalance is not None else (st.unpaidBalance if st else None)
+        ev = []
+        if st is not None:
+            ev.append(f"{st.statementId} · due {st.dueDate} · minimum due {_money(st.minimumPaymentDue or 0.0)}")
+        if self.agreement is not None and bal is not None:
+            ag = self.agreement
+            pct = round(bal * ag.minPercentOfBalance, 2)
+            due = round(min(max(ag.minFixedFloor, pct), max(bal, 0.0)), 2)
+            by = f" by {st.dueDate}" if st is not None else ""
+            return {"answer": f"Your minimum payment is {_money(due)}{by} (greater of {_money(ag.minFixedFloor)} or "
+                              f"{ag.minPercentOfBalance * 100:g}% of the {_money(bal)} statement balance).",
+                    "used_fields": ["agreement.minFixedFloor", "agreement.minPercentOfBalance",
+                                    "account_summary.statementBalance"],
+                    "notes": "Agreement min-payment formula.", "evidence_lines": ev}
+        if st is not None and st.minimumPaymentDue is not None:
+            return {"answer": f"Your minimum payment is {_money(st.minimumPaymentDue)} by {st.dueDate}.",
+                    "used_fields": ["statements.minimumPaymentDue", "statements.dueDate"],
+                    "notes": "No agreement on file; latest statement's minimum due.", "evidence_lines": ev}
+        return None
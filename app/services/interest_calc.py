@@ -1,48 +1,34 @@
 from __future__ import annotations
-from datetime import datetime, timedelta
-from typing import List, Dict
-import zoneinfo
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Optional, Tuple
+import calendar, zoneinfo
+import numpy as np
+from app.core.schemas import Agreement, Transaction
+from app.core.txn_table import TransactionTable
 
-def _to_local(dt_str: str, tz: str):
+def _local_midnights(start_local: datetime | date, end_local: datetime | date, tz: str) -> np.ndarray:
+    # epoch seconds of local midnight for each day in [start, end] plus the day after end (DST-safe)
     tzinfo = zoneinfo.ZoneInfo(tz)
-    return datetime.fromisoformat(dt_str.replace("Z","+00:00")).astimezone(tzinfo)
+    d0 = start_local.date() if isinstance(start_local, datetime) else start_local
+    d1 = end_local.date() if isinstance(end_local, datetime) else end_local
+    days = [d0 + timedelta(days=i) for i in range((d1 - d0).days + 2)]
+    return np.array([int(datetime(d.year, d.month, d.day, tzinfo=tzinfo).timestamp()) for d in days], dtype="int64")
 
-def build_daily_balances_tz(transactions: List[Dict], start_local: datetime, end_local: datetime, tz="America/New_York"):
-    tzinfo = zoneinfo.ZoneInfo(tz)
-    evts = []
-    for t in transactions:
-        if (t.get("transactionStatus") or "").upper() != "POSTED":
-            continue
-        ts_local = _to_local(t["transactionDateTime"], tz)
-        typ = (t.get("transactionType") or "").upper()
-        amt = float(t.get("amount", 0.0))
-        delta = +amt if typ in {"PURCHASE","FEE","INTEREST","CASH_ADVANCE","BALANCE_TRANSFER"} else -amt
-        evts.append((ts_local, delta, float(t.get("endingBalance") or 0.0)))
-    if not evts:
+def daily_balance_cents(transactions: TransactionTable | List[Transaction], start_local: datetime, end_local: datetime,
+                        tz="America/New_York") -> Optional[np.ndarray]:
+    # End-of-day POSTED balance in int64 cents for each local day in [start_local, end_local] (both inclusive).
+    ts, delta, ending, cum = TransactionTable.of(transactions).posted()
+    if not len(ts):
         return None
-    evts.sort(key=lambda x: x[0])
-
-    # Anchor
-    anchor = None
-    for ts, d, endbal in reversed(evts):
-        if ts.date() <= start_local.date():
-            anchor = endbal; break
-    if anchor is None:
-        ts0, d0, end0 = evts[0]
-        anchor = end0 - d0
-
-    day = datetime(start_local.year, start_local.month, start_local.day, tzinfo=tzinfo)
-    end_day = datetime(end_local.year, end_local.month, end_local.day, tzinfo=tzinfo)
-    i = 0
-    balances = []
-    while day <= end_day:
-        next_day = day + timedelta(days=1)
-        while i < len(evts) and day <= evts[i][0] < next_day:
-            anchor += evts[i][1]
-            i += 1
-        balances.append(round(anchor + 1e-9, 2))
-        day = next_day
-    return balances
+    edges = _local_midnights(start_local, end_local, tz)
+    idx = np.searchsorted(ts, edges, "left")  # events before each local midnight
+    # Anchor: balance before the first day = ending balance of the last earlier event, else back out the first event
+    opening = int(ending[idx[0]-1]) if idx[0] > 0 else int(ending[0] - delta[0])
+    return opening + (cum[idx[1:]] - cum[idx[0]])
+
+def build_daily_balances_tz(transactions: TransactionTable | List[Transaction], start_local: datetime, end_local: datetime, tz="America/New_York"):
+    cents = daily_balance_cents(transactions, start_local, end_local, tz)
+    return None if cents is None else [c / 100.0 for c in cents.tolist()]
 
 def monthly_interest_from_daily(daily_balances: List[float], apr_percent: float, basis_days: int, rounding="sum_then_round"):
     dpr = (apr_percent/100.0)/float(basis_days)
@@ -50,3 +36,63 @@ def monthly_interest_from_daily(daily_balances: List[float], apr_percent: float,
         cents = [round(round(b*dpr, 6), 2) for b in daily_balances]
         return round(sum(cents), 2)
     return round(sum(b*dpr for b in daily_balances), 2)
+
+def _daily_cents(x: np.ndarray) -> np.ndarray:
+    # round(round(x, 6), 2) in int64 cents, elementwise, matching monthly_interest_from_daily's daily_then_sum.
+    # Whole micro-units are split into cents in integers; where x sits on a half micro-unit or the micro-units on a
+    # half cent, Python's round depends on the exact binary value, so those (rare) elements take the scalar path.
+    s = x * 1e6
+    micro = np.rint(s).astype("int64")
+    q, r = np.divmod(micro, 10_000)
+    cents = q + (r > 5_000)
+    odd = (np.abs(s - np.floor(s) - 0.5) < 1e-6) | (r == 5_000)
+    if odd.any():
+        cents[odd] = [round(round(round(v, 6), 2) * 100) for v in x[odd].tolist()]
+    return cents
+
+APR_FIELDS = ("purchaseApr", "cashAdvanceApr", "balanceTransferApr", "penaltyApr")
+
+def agreement_aprs(agreement: Optional[Agreement], fallback: Optional[float] = None) -> Dict[str, float]:
+    aprs = {f: getattr(agreement, f) for f in APR_FIELDS if agreement is not None and getattr(agreement, f) is not None}
+    if "purchaseApr" not in aprs and fallback is not None: aprs["purchaseApr"] = fallback
+    return aprs
+
+def period_interest(transactions: TransactionTable | List[Transaction], periods: List[Tuple[date, date]],
+                    aprs: Dict[str, float], basis_days: int = 365, rounding="sum_then_round",
+                    tz="America/New_York") -> Optional[List[Dict[str, float]]]:
+    # Interest per (first_day, last_day) period (inclusive local dates) for every APR at once: one searchsorted
+    # over the covering day range, then each period's days are gathered and reduced together. Each period is
+    # anchored exactly like build_daily_balances_tz; balances stay in integer cents throughout.
+    if not periods or not aprs: return [{} for _ in periods or []]
+    ts, delta, ending, cum = TransactionTable.of(transactions).posted()
+    if not len(ts):
+        return None
+    d0, d1 = min(p[0] for p in periods), max(p[1] for p in periods)
+    idx = np.searchsorted(ts, _local_midnights(d0, d1, tz), "left")  # events before each local midnight
+    starts = np.array([(f - d0).days for f, _ in periods], dtype="int64")
+    lens = np.array([(l - f).days + 1 for f, l in periods], dtype="int64")
+    op = idx[starts]
+    opening = np.where(op > 0, ending[np.maximum(op - 1, 0)], ending[0] - delta[0])
+    days = np.concatenate([np.arange(s, s + n) for s, n in zip(starts.tolist(), lens.tolist())])
+    bal = cum[idx[days + 1]] + np.repeat(opening - cum[op], lens)  # end-of-day cents, period after period
+    offsets = np.concatenate(([0], np.cumsum(lens)[:-1]))
+    names = list(aprs)
+    dpr = np.array([aprs[n] for n in names], dtype="float64")[:, None] / 100.0 / float(basis_days)
+    if rounding == "daily_then_sum":
+        per_day = _daily_cents((bal / 100.0)[None, :] * dpr)
+        vals = np.add.reduceat(per_day, offsets, axis=1) / 100.0
+    else:
+        vals = np.round(np.add.reduceat(bal, offsets)[None, :] / 100.0 * dpr, 2)
+    return [{n: round(float(vals[a, j]), 2) for a, n in enumerate(names)} for j in range(len(periods))]
+
+def month_bounds(ym: str) -> Tuple[date, date]:
+    y, m = int(ym[:4]), int(ym[5:7])
+    return date(y, m, 1), date(y, m, calendar.monthrange(y, m)[1])
+
+def monthly_interest(transactions: TransactionTable | List[Transaction], months: List[str], agreement: Optional[Agreement],
+                     aprs: Optional[Dict[str, float]] = None) -> Optional[Dict[str, Dict[str, float]]]:
+    # {"YYYY-MM": {apr field: interest}} for all months and APRs in one call, using the agreement's basis/rounding/tz.
+    ag = agreement or Agreement()
+    aprs = aprs if aprs is not None else agreement_aprs(agreement)
+    res = period_interest(transactions, [month_bounds(ym) for ym in months], aprs, ag.apr_basis, ag.rounding, ag.tz)
+    return None if res is None else dict(zip(months, res))
@@ -0,0 +1,49 @@
+import os, json, time, hashlib
+from typing import Any, Dict, Optional
+from app.utils.cache import LRUCache, SqliteCache
+
+# Decoding is pinned (temperature=0, top_p=1, fixed seed), so (model, seed, system, prelude) determines the answer.
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./data/.cache/llm.sqlite")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_MAX_ITEMS = int(os.getenv("LLM_CACHE_MAX_ITEMS", "100000"))
+LLM_CACHE_MEM_ITEMS = int(os.getenv("LLM_CACHE_MEM_ITEMS", "2000"))
+
+def fingerprint(model: str, seed: int, system: str, prelude: str) -> str:
+    return hashlib.sha256(json.dumps([model, seed, system, prelude], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    # Parsed JSON answers only; the in-memory LRU keeps hot keys off sqlite. Every hit returns a fresh dict
+    # because callers annotate the result (evidence_lines, calc_request).
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: Optional[float] = LLM_CACHE_TTL,
+                 max_items: int = LLM_CACHE_MAX_ITEMS, mem_items: int = LLM_CACHE_MEM_ITEMS):
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self.mem = LRUCache(mem_items)
+        self.disk = SqliteCache(path, max_items=max_items, ttl=self.ttl, table="llm_responses") if path else None
+        self.hits = self.misses = 0
+
+    def _expiry(self, created: Optional[float] = None) -> float:
+        if self.ttl is None: return float("inf")
+        return (time.time() if created is None else created) + self.ttl
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        hit = self.mem.get(key)
+        raw = hit[0] if hit is not None and hit[1] > time.time() else None
+        if raw is None and self.disk is not None:
+            row = self.disk.get_entry(key)
+            if row is not None:
+                # a promoted row keeps its disk age: it expires created+ttl, not ttl from now
+                raw = row[0].decode("utf-8"); self.mem.put(key, (raw, self._expiry(row[1])))
+        if raw is None:
+            self.misses += 1; return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def put(self, key: str, value: Dict[str, Any]):
+        raw = json.dumps(value, ensure_ascii=False)
+        self.mem.put(key, (raw, self._expiry()))
+        if self.disk is not None: self.disk.put(key, raw.encode("utf-8"))
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": (self.hits / total) if total else 0.0,
+                "memory": self.mem.stats(), "disk": self.disk.stats() if self.disk is not None else None}
@@ -1,35 +1,232 @@
-import os, json
-from typing import Dict, Any
-from openai import OpenAI
+import os, json, queue, random, time, asyncio, threading, contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Tuple, Optional
+import openai
+from openai import OpenAI, AsyncOpenAI
+from app.services.llm_cache import ResponseCache, fingerprint
+from app.utils.json_stream import JsonFieldStream
+from app.utils.tracing import TRACER, span
 
-class LLMService:
-    def __init__(self):
-        self.client = OpenAI(base_url=os.getenv("OPENAI_BASE_URL"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))          # seconds per attempt
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))     # in-flight requests per client
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "60"))  # max wait for a slot before giving up
+
+RETRYABLE = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+def _backoff(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    return random.uniform(0, min(cap, base * (2 ** attempt)))  # full jitter
+
+def _client_kwargs(timeout: float) -> Dict[str, Any]:
+    base_url = os.getenv("OPENAI_BASE_URL")
+    # local OpenAI-compatible servers usually accept any key; the SDK refuses to start without one
+    key = os.getenv("OPENAI_API_KEY") or ("local" if base_url else None)
+    return {"base_url": base_url, "api_key": key, "timeout": timeout, "max_retries": 0}
+
+def _unavailable(e) -> Dict[str, Any]:
+    return {"answer":"No matching data found.","used_fields":[],"notes":f"LLM unavailable: {e}"}
+
+def _try_json(txt: str) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(txt)
+    except Exception as first:
+        s, e = txt.find("{"), txt.rfind("}")
+        if s != -1 and e != -1 and e > s:
+            try:
+                out = json.loads(txt[s:e+1]); TRACER.incr("json_repaired"); return out
+            except Exception: pass
+        TRACER.error("json_parse", first)
+        return None
+
+def parse_json_answer(txt: str) -> Dict[str, Any]:
+    out = _try_json(txt)
+    return out if out is not None else {"answer":"No matching data found.","used_fields":[],"notes":"LLM returned non‑JSON."}
+
+class _Base:
+    def __init__(self, timeout: Optional[float] = None, max_retries: Optional[int] = None,
+                 concurrency: Optional[int] = None, cache: Optional[ResponseCache] = None, use_cache: bool = True):
         self.model = os.getenv("MODEL", os.getenv("OPENAI_MODEL", "gpt-4o-mini"))
         self.seed = int(os.getenv("LLM_SEED","42"))
+        self.timeout = LLM_TIMEOUT if timeout is None else timeout
+        self.max_retries = LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.concurrency = max(1, LLM_CONCURRENCY if concurrency is None else concurrency)
+        self.cache = (cache or ResponseCache()) if use_cache else None
+
+    def _cached(self, system: str, prelude: str):
+        if self.cache is None: return None, None
+        key = fingerprint(self.model, self.seed, system, prelude)
+        return key, self.cache.get(key)
+
+    def _finish(self, key: Optional[str], txt: str) -> Dict[str, Any]:
+        with span("json_parse"): out = _try_json(txt or "")
+        if out is None: return parse_json_answer(txt)
+        if key is not None and isinstance(out, dict): self.cache.put(key, out)  # only real answers are cached
+        return out
+
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        return self.cache.stats() if self.cache is not None else None
+
+    def _params(self, system: str, prelude: str) -> Dict[str, Any]:
+        return dict(
+            model=self.model,
+            temperature=0.0,
+            top_p=1.0,
+            presence_penalty=0,
+            frequency_penalty=0,
+            seed=self.seed,
+            response_format={"type":"json_object"},
+            messages=[{"role":"system","content":system},
+                      {"role":"user","content":prelude}],
+        )
+
+class LLMService(_Base):
+    # Long-lived: one OpenAI client (and its HTTP connection pool) shared by all callers/threads.
+    def __init__(self, client: Optional[OpenAI] = None, **kw):
+        super().__init__(**kw)
+        self._client = client
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+
+    @property
+    def client(self) -> OpenAI:
+        if self._client is None:
+            with self._lock:
+                if self._client is None: self._client = OpenAI(**_client_kwargs(self.timeout))
+        return self._client
+
+    def _complete(self, params: Dict[str, Any]) -> str:
+        if not self._slots.acquire(timeout=LLM_QUEUE_TIMEOUT):
+            raise TimeoutError(f"no free LLM slot within {LLM_QUEUE_TIMEOUT}s ({self.concurrency} in flight)")
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    resp = self.client.chat.completions.create(**params)
+                    return resp.choices[0].message.content
+                except RETRYABLE as e:
+                    if attempt >= self.max_retries: raise
+                    TRACER.error("llm_retry", e)
+                    time.sleep(_backoff(attempt))
+        finally:
+            self._slots.release()
 
     def ask(self, system: str, prelude: str) -> Dict[str, Any]:
+        key, hit = self._cached(system, prelude)
+        if hit is not None: return hit
+        try:
+            with span("llm_request"): txt = self._complete(self._params(system, prelude))
+        except Exception as e:
+            # Endpoint not available, API key missing, retries exhausted or backpressure timeout
+            TRACER.error("llm", e)
+            return _unavailable(e)
+        return self._finish(key, txt)
+
+    def ask_stream(self, system: str, prelude: str) -> Iterator[Tuple[str, Any]]:
+        # Yields ("delta", text) as the JSON "answer" field streams in, then exactly one ("final", dict).
+        # Retries only happen before the first chunk; a failure mid-stream ends with the unavailable fallback.
+        # The upstream stream is drained on its own thread, so the concurrency slot and the "llm" span cover only
+        # the model, not however long the consumer takes between chunks (or a consumer that stops early).
+        key, hit = self._cached(system, prelude)
+        if hit is not None:
+            if isinstance(hit.get("answer"), str): yield "delta", hit["answer"]
+            yield "final", hit; return
+        q: "queue.Queue[Tuple[str, Any]]" = queue.Queue()
+        ctx = contextvars.copy_context()   # the producer's span attaches to the caller's trace
+        threading.Thread(target=ctx.run, args=(self._drain, key, system, prelude, q), name="llm-stream", daemon=True).start()
+        while True:
+            kind, val = q.get()
+            yield kind, val
+            if kind == "final": return
+
+    def _drain(self, key: Optional[str], system: str, prelude: str, q: "queue.Queue[Tuple[str, Any]]"):
+        if not self._slots.acquire(timeout=LLM_QUEUE_TIMEOUT):
+            e = TimeoutError(f"no free LLM slot within {LLM_QUEUE_TIMEOUT}s")
+            TRACER.error("llm", e); q.put(("final", _unavailable(e))); return
         try:
-            resp = self.client.chat.completions.create(
-                model=self.model,
-                temperature=0.0,
-                top_p=1.0,
-                presence_penalty=0,
-                frequency_penalty=0,
-                seed=self.seed,
-                response_format={"type":"json_object"},
-                messages=[{"role":"system","content":system},
-                          {"role":"user","content":prelude}],
-            )
-            txt = resp.choices[0].message.content
+            with span("llm"):
+                txt = self._stream_text(system, prelude, q)
         except Exception as e:
-            # Endpoint not available or API key missing
-            return {"answer":"No matching data found.","used_fields":[],"notes":f"LLM unavailable: {e}"}
+            TRACER.error("llm", e); q.put(("final", _unavailable(e))); return
+        finally:
+            self._slots.release()
+        q.put(("final", self._finish(key, txt)))
+
+    def _stream_text(self, system: str, prelude: str, q: "queue.Queue[Tuple[str, Any]]") -> str:
+        stream, t0 = None, time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                stream = self.client.chat.completions.create(stream=True, **self._params(system, prelude)); break
+            except RETRYABLE as e:
+                if attempt >= self.max_retries: raise
+                TRACER.error("llm_retry", e)
+                time.sleep(_backoff(attempt))
+        parts, field = [], JsonFieldStream("answer")
+        for chunk in stream:
+            if not chunk.choices: continue
+            piece = chunk.choices[0].delta.content or ""
+            if not piece: continue
+            if not parts: TRACER.observe("llm_first_token", (time.perf_counter() - t0) * 1000)
+            parts.append(piece)
+            if field.closed: continue
+            out = field.feed(piece)
+            if out: q.put(("delta", out))
+        return "".join(parts)
+
+    def ask_many(self, items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        # (system, prelude) pairs, answered concurrently up to the client's concurrency limit; order preserved
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, max(1, len(items)))) as ex:
+            return list(ex.map(lambda it: self.ask(*it), items))
+
+class AsyncLLMService(_Base):
+    def __init__(self, client: Optional[AsyncOpenAI] = None, **kw):
+        super().__init__(**kw)
+        self._client = client
+        self._slots = asyncio.Semaphore(self.concurrency)
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        if self._client is None: self._client = AsyncOpenAI(**_client_kwargs(self.timeout))
+        return self._client
+
+    async def _complete(self, params: Dict[str, Any]) -> str:
+        await asyncio.wait_for(self._slots.acquire(), LLM_QUEUE_TIMEOUT)
         try:
-            return json.loads(txt)
-        except Exception:
-            s, e = txt.find("{"), txt.rfind("}")
-            if s != -1 and e != -1 and e > s:
-                try: return json.loads(txt[s:e+1])
-                except Exception: pass
-            return {"answer":"No matching data found.","used_fields":[],"notes":"LLM returned non‑JSON."}
+            for attempt in range(self.max_retries + 1):
+                try:
+                    resp = await self.client.chat.completions.create(**params)
+                    return resp.choices[0].message.content
+                except RETRYABLE as e:
+                    if attempt >= self.max_retries: raise
+                    TRACER.error("llm_retry", e)
+                    await asyncio.sleep(_backoff(attempt))
+        finally:
+            self._slots.release()
+
+    async def ask(self, system: str, prelude: str) -> Dict[str, Any]:
+        # the response cache is sqlite-backed: its reads/writes run in a thread, never on the event loop
+        key, hit = await asyncio.to_thread(self._cached, system, prelude)
+        if hit is not None: return hit
+        try:
+            with span("llm_request"): txt = await self._complete(self._params(system, prelude))
+        except Exception as e:
+            TRACER.error("llm", e)
+            return _unavailable(e)
+        return await asyncio.to_thread(self._finish, key, txt)
+
+    async def acache_stats(self) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.cache_stats)
+
+    async def ask_many(self, items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        return list(await asyncio.gather(*(self.ask(s, p) for s, p in items)))
+
+    async def aclose(self):
+        if self._client is not None: await self._client.close()
+
+_shared: Optional[LLMService] = None
+_shared_lock = threading.Lock()
+
+def get_llm() -> LLMService:
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None: _shared = LLMService()
+    return _shared
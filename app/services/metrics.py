@@ -2,25 +2,18 @@ from __future__ import annotations
 from typing import List, Dict, Tuple, Optional
 from datetime import datetime, timezone
 import re
-
-def _parse_iso(dt: str) -> datetime:
-    if dt.endswith("Z"):
-        return datetime.fromisoformat(dt.replace("Z","+00:00"))
-    return datetime.fromisoformat(dt)
-
-def _sum_interest(transactions: List[Dict], start=None, end=None):
-    total = 0.0; ev = []
-    for t in transactions:
-        if (t.get("transactionStatus","").upper()!="POSTED" or 
-            t.get("transactionType","").upper()!="INTEREST"):
-            continue
-        ts = _parse_iso(t["transactionDateTime"]).astimezone(timezone.utc)
-        if start is None or (start <= ts < end):
-            amt = float(t.get("amount",0.0))
-            total += amt
-            ev.append((t.get("transactionId",""), amt, t["transactionDateTime"]))
+from app.core.schemas import Transaction
+from app.core.txn_table import TransactionTable
+
+def _sum_interest(transactions: TransactionTable | List[Transaction], start=None, end=None):
+    tbl = TransactionTable.of(transactions)
+    pos, cents = tbl.window("INTEREST", "POSTED", start, end)
+    ev = []
+    for p in pos:
+        t = tbl.record(p)
+        ev.append((t.transactionId, float(t.amount), t.transactionDateTime))
     ev.sort(key=lambda x: x[2])
-    return round(total,2), ev
+    return round(cents / 100.0, 2), ev
 
 def _year_bounds(now: datetime):
     s = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0, tzinfo=timezone.utc)
@@ -32,13 +25,13 @@ def _month_bounds(now: datetime):
     e = s.replace(year=s.year+1, month=1) if s.month==12 else s.replace(month=s.month+1)
     return s, e
 
-def total_interest_all(transactions: List[Dict]):
+def total_interest_all(transactions: TransactionTable | List[Transaction]):
     return _sum_interest(transactions)
 
-def total_interest_year(transactions: List[Dict], now: datetime):
+def total_interest_year(transactions: TransactionTable | List[Transaction], now: datetime):
     s,e = _year_bounds(now); return _sum_interest(transactions, s, e)
 
-def total_interest_month(transactions: List[Dict], now: datetime):
+def total_interest_month(transactions: TransactionTable | List[Transaction], now: datetime):
     s,e = _month_bounds(now); return _sum_interest(transactions, s, e)
 
 TOTAL_PATTERNS = [
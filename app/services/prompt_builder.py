@@ -0,0 +1,58 @@
+import os, logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+log = logging.getLogger(__name__)
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))      # whole request: system + user message
+PROMPT_SNIPPET_TOKENS = int(os.getenv("PROMPT_SNIPPET_TOKENS", "240"))   # cap per retrieved snippet
+
+class Tokenizer:
+    # tiktoken when its encoding is available; otherwise a ~4 chars/token estimate so prompts still get built offline.
+    def __init__(self, model: str):
+        self.enc = None
+        try:
+            import tiktoken
+            try: self.enc = tiktoken.encoding_for_model(model)
+            except KeyError: self.enc = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            log.warning("tiktoken unavailable (%s); using approximate token counts", e)
+        self.exact = self.enc is not None
+
+    def count(self, text: str) -> int:
+        return len(self.enc.encode(text, disallowed_special=())) if self.enc else (len(text) + 3) // 4
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if self.enc is None: return text[:max_tokens * 4]
+        toks = self.enc.encode(text, disallowed_special=())
+        return text if len(toks) <= max_tokens else self.enc.decode(toks[:max_tokens])
+
+class PromptBuilder:
+    # The static context (glossary/rules/formulas) is rendered and counted once; every prompt starts with exactly
+    # that prefix so provider-side prompt caching can reuse it. Snippets are packed by score into what is left.
+    def __init__(self, system: str, glossary: str, rules: str, formulas: str, model: Optional[str] = None,
+                 budget: int = PROMPT_TOKEN_BUDGET, snippet_tokens: int = PROMPT_SNIPPET_TOKENS):
+        self.tok = Tokenizer(model or os.getenv("MODEL", os.getenv("OPENAI_MODEL", "gpt-4o-mini")))
+        self.budget, self.snippet_tokens = budget, snippet_tokens
+        self.system = system
+        self.static = f"# Glossary\n{glossary}\n\n# Rules\n{rules}\n\n# Formulas\n{formulas}\n\n# Snippets\n"
+        self.system_tokens = self.tok.count(system)
+        self.static_tokens = self.tok.count(self.static)
+
+    def build(self, question: str, snippets: Sequence[Tuple[float, str]]) -> Tuple[str, List[str], Dict[str, Any]]:
+        # -> (prelude, snippets used, token report)
+        tail = f"\n\nQuestion: {question}"
+        q_tokens = self.tok.count(tail)
+        room = self.budget - self.system_tokens - self.static_tokens - q_tokens
+        used, used_tokens, dropped = [], 0, 0
+        for _, text in sorted(snippets, key=lambda x: -x[0]):
+            line = "- " + self.tok.truncate(text, self.snippet_tokens) + "\n"
+            n = self.tok.count(line)
+            if used_tokens + n > room:
+                dropped += 1; continue
+            used.append(line[2:-1]); used_tokens += n
+        prelude = self.static + "".join(f"- {s}\n" for s in used).rstrip("\n") + tail
+        report = {"budget": self.budget, "system": self.system_tokens, "static": self.static_tokens,
+                  "snippets": used_tokens, "question": q_tokens,
+                  "total": self.system_tokens + self.static_tokens + used_tokens + q_tokens,
+                  "snippets_used": len(used), "snippets_dropped": dropped, "exact": self.tok.exact}
+        return prelude, used, report
@@ -0,0 +1,113 @@
+from __future__ import annotations
+import json, os, sys, time
+import multiprocessing as mp
+from datetime import date, datetime, time as dtime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import zoneinfo
+from app.core.schemas import Agreement, Statement
+from app.core.txn_table import TransactionTable
+from app.services.interest_calc import period_interest
+from app.utils.loader import iter_records
+
+def _local_date(dt_str: str, tz: str, exclusive: bool = False, ceil: bool = False) -> date:
+    dt = datetime.fromisoformat(dt_str.replace("Z", "+00:00")).astimezone(zoneinfo.ZoneInfo(tz))
+    if exclusive: dt -= timedelta(microseconds=1)  # closingDateTime is exclusive (see glossary)
+    if ceil and dt.time() != dtime.min: return dt.date() + timedelta(days=1)  # first local midnight at or after dt
+    return dt.date()
+
+def statement_period(st: Statement, tz: str) -> Tuple[date, date]:
+    # (first, last) local day, both inclusive. The opening instant is rounded up to a local midnight so that it lands
+    # on the day after the previous statement's last day rather than on that same day.
+    return _local_date(st.openingDateTime, tz, ceil=True), _local_date(st.closingDateTime, tz, exclusive=True)
+
+def load_agreement(account_dir: str, default: Optional[Agreement] = None) -> Optional[Agreement]:
+    path = os.path.join(account_dir, "agreement.json")
+    if os.path.exists(path):
+        with open(path) as f: return Agreement(**json.load(f))
+    return default
+
+def reconcile_account(account_dir: str, default_agreement: Optional[Agreement] = None,
+                      tolerance: float = 0.005) -> Dict[str, Any]:
+    # Recompute each statement's interest from the ledger and compare with Statement.interestCharged.
+    t0 = time.perf_counter()
+    out: Dict[str, Any] = {"account_dir": account_dir, "accountId": None, "statements": 0, "mismatches": [], "error": None}
+    try:
+        rejects: List[Any] = []
+        acc = list(iter_records(account_dir, "account_summary", rejects))
+        stmts = list(iter_records(account_dir, "statements", rejects))
+        table = TransactionTable.from_records(list(iter_records(account_dir, "transactions", rejects)))
+        out["accountId"] = acc[0].accountId if acc else os.path.basename(os.path.normpath(account_dir))
+        out["statements"], out["rejected_rows"] = len(stmts), len(rejects)
+        ag = load_agreement(account_dir, default_agreement) or Agreement()
+        apr = ag.purchaseApr if ag.purchaseApr is not None else (acc[0].purchaseApr if acc else None)
+        if apr is None:
+            out["error"] = "no purchase APR in agreement or account summary"; return out
+        if not stmts: return out
+        periods = [statement_period(s, ag.tz) for s in stmts]
+        res = period_interest(table, periods, {"purchaseApr": apr}, ag.apr_basis, ag.rounding, ag.tz)
+        if res is None:
+            out["error"] = "no posted transactions"; return out
+        for st, (first, last), r in zip(stmts, periods, res):
+            expected, charged = r["purchaseApr"], round(float(st.interestCharged or 0.0), 2)
+            if abs(expected - charged) > tolerance:
+                out["mismatches"].append({"accountId": out["accountId"], "statementId": st.statementId,
+                                          "period": [first.isoformat(), last.isoformat()], "expected": expected,
+                                          "charged": charged, "diff": round(expected - charged, 2), "apr": apr,
+                                          "basis": ag.apr_basis, "rounding": ag.rounding})
+    except Exception as e:
+        out["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        out["seconds"] = round(time.perf_counter() - t0, 4)
+    return out
+
+def iter_account_dirs(root: str) -> Iterator[str]:
+    # every directory under root that holds a transactions file is one account
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        if "transactions.json" in filenames or "transactions.jsonl" in filenames:
+            yield dirpath
+
+_default_agreement: Optional[Agreement] = None
+
+def _init(default_agreement: Optional[dict]):
+    global _default_agreement
+    _default_agreement = Agreement(**default_agreement) if default_agreement else None
+
+def _work(account_dir: str) -> Dict[str, Any]:
+    return reconcile_account(account_dir, _default_agreement)
+
+def run(root: str, out_dir: str, workers: int = 0, chunksize: int = 64, default_agreement: Optional[Agreement] = None,
+        progress_every: float = 5.0) -> Dict[str, Any]:
+    # Accounts are scheduled across a process pool in chunks; results stream into mismatches.jsonl/errors.jsonl.
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    dirs = iter_account_dirs(root)
+    summary = {"accounts": 0, "statements": 0, "mismatched_statements": 0, "accounts_with_mismatch": 0, "errors": 0}
+    t0 = last = time.perf_counter()
+    init_args = (default_agreement.model_dump() if default_agreement else None,)
+    with open(os.path.join(out_dir, "mismatches.jsonl"), "w") as mf, open(os.path.join(out_dir, "errors.jsonl"), "w") as ef:
+        if workers == 1:
+            _init(*init_args); results = map(_work, dirs); pool = None
+        else:
+            pool = mp.get_context("spawn").Pool(workers, initializer=_init, initargs=init_args)
+            results = pool.imap_unordered(_work, dirs, chunksize=chunksize)
+        try:
+            for r in results:
+                summary["accounts"] += 1; summary["statements"] += r["statements"]
+                if r["error"]:
+                    summary["errors"] += 1; ef.write(json.dumps({k: r[k] for k in ("account_dir", "accountId", "error")}) + "\n")
+                if r["mismatches"]:
+                    summary["accounts_with_mismatch"] += 1; summary["mismatched_statements"] += len(r["mismatches"])
+                    for m in r["mismatches"]: mf.write(json.dumps(m) + "\n")
+                now = time.perf_counter()
+                if now - last >= progress_every:
+                    last = now
+                    print(f"[reconcile] {summary['accounts']} accounts, {summary['accounts'] / (now - t0):.1f} acc/s, "
+                          f"{summary['mismatched_statements']} mismatches, {summary['errors']} errors", file=sys.stderr)
+        finally:
+            if pool is not None: pool.close(); pool.join()
+    dt = time.perf_counter() - t0
+    summary.update({"seconds": round(dt, 2), "accounts_per_s": round(summary["accounts"] / dt, 1) if dt else None,
+                    "workers": workers, "chunksize": chunksize})
+    with open(os.path.join(out_dir, "summary.json"), "w") as f: json.dump(summary, f, indent=2)
+    return summary
@@ -0,0 +1,114 @@
+from __future__ import annotations
+import os, time, threading, logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+from app.core.rag.faiss_store import FaissStore
+from app.core.rag.retriever import HybridRetriever
+from app.core.schemas import Agreement
+from app.core.txn_table import TransactionTable
+from app.services.embedder import embed_texts
+from app.services.indexer import corpus_records, sync_index
+from app.services.intent_router import IntentRouter
+from app.utils.loader import load_corpus
+
+log = logging.getLogger(__name__)
+
+DATA_POLL_SECONDS = float(os.getenv("DATA_POLL_SECONDS", "2"))   # how often data/ is checked for changes
+
+@dataclass(frozen=True)
+class Snapshot:
+    # Everything derived from one state of data/. Read-only once built and shared by every session.
+    corpus: Dict[str, Any]
+    agreement: Optional[Agreement]
+    txns: TransactionTable
+    store: FaissStore
+    retriever: HybridRetriever
+    router: IntentRouter
+    index_stats: Dict[str, int]
+    version: int = 0
+    fingerprint: Tuple = ()
+    built_at: float = field(default_factory=time.time)
+
+def build_snapshot(corpus: Dict[str, Any], agreement: Optional[Agreement], version: int = 0,
+                   fingerprint: Tuple = ()) -> Snapshot:
+    txns = corpus.get("txn_table")
+    if txns is None: txns = TransactionTable.from_records(corpus.get("transactions", []))
+    store, stats = sync_index(corpus_records(corpus))
+    return Snapshot(corpus=corpus, agreement=agreement, txns=txns, store=store,
+                    retriever=HybridRetriever(store, corpus, embed_texts), router=IntentRouter(corpus, agreement, txns),
+                    index_stats=stats, version=version, fingerprint=fingerprint)
+
+def data_fingerprint(data_dir: str) -> Tuple:
+    # (name, size, mtime) of the top-level data files; hidden dirs (.index/.cache) are ours and ignored
+    out = []
+    try:
+        with os.scandir(data_dir) as it:
+            for e in it:
+                if e.name.startswith(".") or not e.is_file(): continue
+                s = e.stat()
+                out.append((e.name, s.st_size, s.st_mtime_ns))
+    except FileNotFoundError:
+        pass
+    return tuple(sorted(out))
+
+def _load(data_dir: str) -> Tuple[Dict[str, Any], Optional[Agreement]]:
+    from app.services.agreement_extractor import ensure_agreement_json   # PDF tooling only needed here
+    path = lambda name: os.path.join(data_dir, name)
+    return load_corpus(data_dir), ensure_agreement_json(path("agreement.pdf"), path("agreement.json"),
+                                                        path("agreement.meta.json"))
+
+class SharedData:
+    # Process-wide holder of the current Snapshot. current() is a cheap attribute read plus a throttled stat() of
+    # data/; when files change a new snapshot is built on a background thread while the old one keeps serving,
+    # then swapped in with a single assignment.
+    def __init__(self, data_dir: str = "./data", poll: float = DATA_POLL_SECONDS,
+                 loader: Callable[[str], Tuple[Dict[str, Any], Optional[Agreement]]] = _load):
+        self.data_dir, self.poll, self.loader = data_dir, poll, loader
+        self._lock = threading.Lock()
+        self._building: Optional[threading.Thread] = None
+        self._checked = 0.0
+        self._failed: Tuple = ()
+        self.last_error: Optional[str] = None
+        self._snap = self._build(1)
+
+    def _build(self, version: int, fp: Optional[Tuple] = None) -> Snapshot:
+        # fingerprint before loading: a file edited mid-build (or rewritten by the loader, e.g. agreement.json) then
+        # differs from the snapshot's fingerprint and is picked up by the next rebuild instead of being lost
+        fp = data_fingerprint(self.data_dir) if fp is None else fp
+        corpus, agreement = self.loader(self.data_dir)
+        return build_snapshot(corpus, agreement, version, fp)
+
+    def current(self) -> Snapshot:
+        now = time.monotonic()
+        if self.poll >= 0 and now - self._checked >= self.poll:
+            self._checked = now
+            fp = data_fingerprint(self.data_dir)
+            if fp != self._snap.fingerprint and fp != self._failed: self._start_rebuild()
+        return self._snap
+
+    def _start_rebuild(self):
+        with self._lock:
+            if self._building is not None and self._building.is_alive(): return
+            self._building = threading.Thread(target=self._rebuild, name="data-reload", daemon=True)
+            self._building.start()
+
+    def _rebuild(self):
+        # loops until data/ still matches the snapshot just built, so changes made during a build are not lost
+        while True:
+            fp = data_fingerprint(self.data_dir)
+            if fp == self._snap.fingerprint: return
+            t0 = time.perf_counter()
+            try:
+                snap = self._build(self._snap.version + 1, fp)
+            except Exception as e:
+                # keep serving the previous snapshot; a half-written file will be retried on the next change
+                self._failed, self.last_error = fp, f"{type(e).__name__}: {e}"
+                log.warning("data reload failed, keeping snapshot v%d: %s", self._snap.version, self.last_error)
+                return
+            self._snap, self.last_error = snap, None
+            log.info("data snapshot v%d built in %.2fs %s", snap.version, time.perf_counter() - t0, snap.index_stats)
+
+    def reload(self, wait: bool = True) -> Snapshot:
+        self._start_rebuild()
+        if wait and self._building is not None: self._building.join()
+        return self._snap
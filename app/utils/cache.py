@@ -0,0 +1,126 @@
+import os, sqlite3, threading, time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+class LRUCache:
+    def __init__(self, max_items: int):
+        self.max_items = max(0, int(max_items))
+        self._d: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def __len__(self): return len(self._d)
+
+    def get(self, key: str):
+        with self._lock:
+            v = self._d.get(key)
+            if v is None:
+                self.misses += 1; return None
+            self._d.move_to_end(key)
+            self.hits += 1
+            return v
+
+    def put(self, key: str, value: Any):
+        if not self.max_items: return
+        with self._lock:
+            self._d[key] = value
+            self._d.move_to_end(key)
+            while len(self._d) > self.max_items:
+                self._d.popitem(last=False)
+
+    def clear(self):
+        with self._lock: self._d.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {"items": len(self._d), "max_items": self.max_items, "hits": self.hits, "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0}
+
+class SqliteCache:
+    # Bytes-valued key/value store; evicts least-recently-used rows past max_items, expires rows older than ttl.
+    # Writes keep an upper-bound row count instead of COUNT(*)-ing the table: eviction only runs once that bound
+    # passes max_items and then trims to LOW_WATER of it, and expired rows are swept at most every SWEEP_SECONDS
+    # (get_many already skips them).
+    LOW_WATER = 0.9
+    SWEEP_SECONDS = 60.0
+    def __init__(self, path: str, max_items: int = 1_000_000, ttl: Optional[float] = None, table: str = "kv"):
+        d = os.path.dirname(path)
+        if d: os.makedirs(d, exist_ok=True)
+        self.path, self.max_items, self.ttl, self.table = path, int(max_items), ttl, table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (k TEXT PRIMARY KEY, v BLOB NOT NULL, "
+                           "created REAL NOT NULL, used REAL NOT NULL)")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_used ON {table}(used)")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_created ON {table}(created)")
+        self.hits = self.misses = self.evictions = 0
+        self._count = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]   # >= rows in the table
+        self._next_sweep = 0.0
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        return {k: v for k, (v, _) in self._get_rows(keys).items()}
+
+    def _get_rows(self, keys: Iterable[str]) -> Dict[str, Tuple[bytes, float]]:
+        # key -> (value, created) for live rows; marks them used
+        keys = list(dict.fromkeys(keys))
+        out: Dict[str, Tuple[bytes, float]] = {}
+        now = time.time()
+        with self._lock:
+            for s in range(0, len(keys), 500):  # stay under SQLITE_MAX_VARIABLE_NUMBER
+                chunk = keys[s:s+500]
+                q = f"SELECT k, v, created FROM {self.table} WHERE k IN ({','.join('?'*len(chunk))})"
+                for k, v, created in self._conn.execute(q, chunk):
+                    if self.ttl is not None and now - created > self.ttl: continue
+                    out[k] = (v, created)
+            if out:
+                self._conn.executemany(f"UPDATE {self.table} SET used=? WHERE k=?", [(now, k) for k in out])
+            self.hits += len(out); self.misses += len(keys) - len(out)
+        return out
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+
+    def get_entry(self, key: str) -> Optional[Tuple[bytes, float]]:
+        # -> (value, created epoch seconds), so a caller's own expiry can follow the row's age
+        return self._get_rows([key]).get(key)
+
+    def put_many(self, items: Dict[str, bytes]):
+        if not items or self.max_items <= 0: return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(f"INSERT OR REPLACE INTO {self.table}(k, v, created, used) VALUES (?,?,?,?)",
+                                   [(k, v, now, now) for k, v in items.items()])
+            self._conn.execute("COMMIT")
+            self._count += len(items)   # replaced keys over-count; _evict recounts before deleting anything
+            self._evict(now)
+
+    def put(self, key: str, value: bytes): self.put_many({key: value})
+
+    def _evict(self, now: float):
+        if self.ttl is not None and now >= self._next_sweep:
+            self._next_sweep = now + self.SWEEP_SECONDS
+            n = self._conn.execute(f"DELETE FROM {self.table} WHERE created < ?", (now - self.ttl,)).rowcount
+            self.evictions += n; self._count -= n
+        if self._count <= self.max_items: return
+        self._count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        if self._count > self.max_items:
+            over = self._count - int(self.max_items * self.LOW_WATER)
+            n = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE k IN (SELECT k FROM {self.table} ORDER BY used LIMIT ?)", (over,)).rowcount
+            self.evictions += n; self._count -= n
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}"); self._count = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {"items": len(self), "max_items": self.max_items, "ttl": self.ttl, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions, "hit_rate": (self.hits / total) if total else 0.0}
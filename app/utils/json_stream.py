@@ -0,0 +1,75 @@
+from typing import Optional
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+class JsonFieldStream:
+    # Incrementally pulls one top-level string field (default "answer") out of a JSON object arriving in chunks.
+    # feed() returns the newly decoded characters of that field; everything else is only tokenised enough to
+    # track nesting and keys, so the cost is O(1) per input character.
+    def __init__(self, field: str = "answer"):
+        self.field = field
+        self.depth = 0
+        self.in_str = False
+        self.esc: Optional[str] = None      # pending escape sequence after a backslash
+        self.pending_hi: Optional[str] = None  # high surrogate waiting for its pair
+        self.cur: list = []                 # current string's text (keys / field value)
+        self.last_key: Optional[str] = None
+        self.expect_value = False           # saw `"field":` at depth 1
+        self.capturing = False
+        self.done = False                   # field value fully read
+        self.closed = False                 # top-level object closed
+
+    def _emit(self, ch: str, out: list):
+        if self.capturing: out.append(ch)
+        elif self.depth == 1: self.cur.append(ch)
+
+    def _char(self, ch: str, out: list):
+        if self.esc is not None:
+            self.esc += ch
+            if self.esc[0] == "u":
+                if len(self.esc) < 5: return
+                cp = int(self.esc[1:], 16); self.esc = None
+                if 0xD800 <= cp < 0xDC00:
+                    self.pending_hi = chr(cp); return
+                s = chr(cp)
+                if self.pending_hi is not None:
+                    s = (self.pending_hi + s).encode("utf-16", "surrogatepass").decode("utf-16"); self.pending_hi = None
+                for c in s: self._emit(c, out)
+                return
+            s = _ESCAPES.get(self.esc, self.esc); self.esc = None
+            self._emit(s, out); return
+        if self.in_str:
+            if ch == "\\": self.esc = ""; return
+            if ch == '"':
+                self.in_str = False
+                if self.capturing:
+                    self.capturing = False; self.done = True
+                elif self.depth == 1:
+                    self.last_key = "".join(self.cur)
+                self.cur = []
+                return
+            self._emit(ch, out); return
+        if ch.isspace(): return
+        if self.expect_value:
+            self.expect_value = False
+            if ch == '"':
+                self.in_str = self.capturing = True; return
+        if ch == '"':
+            self.in_str = True; self.cur = []
+        elif ch == ":":
+            if self.depth == 1 and self.last_key == self.field and not self.done: self.expect_value = True
+        elif ch in "{[":
+            self.depth += 1
+        elif ch in "}]":
+            self.depth -= 1
+            if self.depth == 0: self.closed = True
+        elif ch == ",":
+            self.last_key = None
+
+    def feed(self, chunk: str) -> str:
+        # text after the top-level object closes (trailing prose, a second object) is ignored
+        out: list = []
+        for ch in chunk:
+            if self.closed: break
+            self._char(ch, out)
+        return "".join(out)
@@ -1,36 +1,147 @@
-import json, os
-from typing import Dict, Any, List, Type, TypeVar
+import json, os, logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Any, List, Type, TypeVar, Iterator, Tuple, Optional
+from pydantic import TypeAdapter, ValidationError
 from app.core.schemas import AccountSummary, Statement, Payment, Transaction
+from app.core.txn_table import TransactionTable
 
 T = TypeVar("T")
+log = logging.getLogger(__name__)
 
-def _load_list(path: str) -> list:
-    try:
-        with open(path, "r") as f:
-            data = json.load(f)
-            return data if isinstance(data, list) else []
-    except Exception:
-        return []
-
-def _validate(items: list, model: Type[T]) -> list:
-    out = []
-    for i, it in enumerate(items):
+CHUNK = 1 << 20
+BATCH = int(os.getenv("LOADER_BATCH", "10000"))
+
+@dataclass
+class Rejection:
+    file: str
+    row: int  # position in the file (array index or 0-based line number)
+    error: str
+
+def _element_end(buf: str, pos: int) -> int:
+    # Index of the top-level "," or "]" that ends the array element starting at pos, or -1 if the buffer ends
+    # first. Only strings and bracket depth are tracked, so it also finds the end of a malformed element.
+    depth, in_str, esc = 0, False, False
+    for i in range(pos, len(buf)):
+        ch = buf[i]
+        if in_str:
+            if esc: esc = False
+            elif ch == "\\": esc = True
+            elif ch == '"': in_str = False
+        elif ch == '"': in_str = True
+        elif ch in "{[": depth += 1
+        elif ch in "}]":
+            if depth == 0: return i
+            depth -= 1
+        elif ch == "," and depth == 0: return i
+    return -1
+
+def _iter_json(path: str, rejects: List[Rejection]) -> Iterator[Tuple[int, Any]]:
+    # Incremental parse of a top-level JSON array, or of JSON Lines; only one chunk + one row is held at a time.
+    dec = json.JSONDecoder()
+    fname = os.path.basename(path)
+    with open(path, "r") as f:
+        buf, pos = f.read(CHUNK), 0
+        while pos < len(buf) and buf[pos].isspace(): pos += 1
+        if pos < len(buf) and buf[pos] != "[":
+            f.seek(0)
+            first = True
+            for n, line in enumerate(f):
+                if not line.strip(): continue
+                try: obj = json.loads(line)
+                except ValueError as e:
+                    # a first line that does not parse on its own (e.g. a pretty-printed object) is not JSON Lines:
+                    # one rejection for the file instead of one per line
+                    rejects.append(Rejection(fname, n, "not a JSON array" if first else f"invalid JSON: {e}"))
+                    if first: return
+                    continue
+                first = False
+                yield n, obj
+            return
+        pos += 1; row = 0; eof = False
+        while True:
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ","): pos += 1
+            if pos < len(buf) and buf[pos] == "]": return
+            if pos >= len(buf) and eof:
+                rejects.append(Rejection(fname, row, "truncated JSON array")); return
+            try:
+                if pos >= len(buf): raise json.JSONDecodeError("need more data", buf, pos)
+                obj, end = dec.raw_decode(buf, pos)
+                if end == len(buf) and not eof: raise json.JSONDecodeError("value may continue", buf, pos)
+            except json.JSONDecodeError as e:
+                end = _element_end(buf, pos)
+                if end != -1:
+                    # the element is complete and still does not parse: reject it alone and carry on after it
+                    rejects.append(Rejection(fname, row, f"invalid JSON: {e}"))
+                    row += 1; pos = end; continue
+                if eof:
+                    rejects.append(Rejection(fname, row, f"invalid JSON: {e}")); return  # truncated mid-element
+                more = f.read(CHUNK)
+                eof = not more
+                buf, pos = buf[pos:] + more, 0
+                continue
+            yield row, obj
+            row += 1; pos = end
+
+@lru_cache(maxsize=None)
+def _adapter(model: Type[T]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+def _validate(rows: Iterator[Tuple[int, Any]], model: Type[T], fname: str, rejects: List[Rejection],
+              batch_size: int = BATCH) -> Iterator[T]:
+    adapter = _adapter(model)
+    def run(batch):
+        idxs, objs = [b[0] for b in batch], [b[1] for b in batch]
         try:
-            m = model(**it)  # validate
-            out.append(m.model_dump())  # return plain dicts for downstream code
-        except Exception as e:
-            # Skip invalid rows; you could log e here if needed
-            continue
-    return out
+            return adapter.validate_python(objs)
+        except ValidationError as e:
+            bad: Dict[int, List[str]] = {}
+            for err in e.errors(include_url=False):
+                field = ".".join(str(x) for x in err["loc"][1:]) or "row"
+                bad.setdefault(err["loc"][0], []).append(f"{field}: {err['msg']}")
+            for j, msgs in bad.items(): rejects.append(Rejection(fname, idxs[j], "; ".join(msgs)))
+            return adapter.validate_python([o for j, o in enumerate(objs) if j not in bad])
+    batch = []
+    for item in rows:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield from run(batch); batch = []
+    if batch: yield from run(batch)
+
+FILES = [
+    ("account_summary", "account_summary", AccountSummary),
+    ("statements", "statements", Statement),
+    ("payments", "payments", Payment),
+    ("transactions", "transactions", Transaction),
+]
+
+def _find(data_dir: str, stem: str) -> Optional[str]:
+    for ext in (".json", ".jsonl"):
+        p = os.path.join(data_dir, stem + ext)
+        if os.path.exists(p): return p
+    return None
+
+def iter_records(data_dir: str, rtype: str, rejects: Optional[List[Rejection]] = None) -> Iterator[Any]:
+    rejects = rejects if rejects is not None else []
+    stem, model = next((s, m) for r, s, m in FILES if r == rtype)
+    path = _find(data_dir, stem)
+    if not path: return
+    try:
+        yield from _validate(_iter_json(path, rejects), model, os.path.basename(path), rejects)
+    except OSError as e:
+        rejects.append(Rejection(os.path.basename(path), -1, f"unreadable: {e}"))
+
+def iter_corpus(data_dir: str, rejects: Optional[List[Rejection]] = None) -> Iterator[Tuple[str, int, Any]]:
+    # (rtype, index among valid rows, record), one file at a time; nothing is kept after it is yielded
+    for rtype, _, _ in FILES:
+        for i, r in enumerate(iter_records(data_dir, rtype, rejects)):
+            yield rtype, i, r
 
 def load_corpus(data_dir: str) -> Dict[str, Any]:
-    acc = _validate(_load_list(os.path.join(data_dir, "account_summary.json")), AccountSummary)
-    stm = _validate(_load_list(os.path.join(data_dir, "statements.json")), Statement)
-    pay = _validate(_load_list(os.path.join(data_dir, "payments.json")), Payment)
-    txs = _validate(_load_list(os.path.join(data_dir, "transactions.json")), Transaction)
-    return {
-        "account_summary": acc,
-        "transactions": txs,
-        "payments": pay,
-        "statements": stm,
-    }
+    rejects: List[Rejection] = []
+    out: Dict[str, Any] = {rtype: list(iter_records(data_dir, rtype, rejects)) for rtype, _, _ in FILES}
+    if rejects:
+        log.warning("load_corpus(%s): rejected %d rows, first: %s", data_dir, len(rejects), rejects[0])
+    out["rejected"] = rejects
+    out["txn_table"] = TransactionTable.from_records(out["transactions"])
+    return out
@@ -0,0 +1,190 @@
+import os, io, time, random, bisect, asyncio, logging, threading, contextvars, cProfile, pstats
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+log = logging.getLogger(__name__)
+
+# cProfile.enable() silently replaces an active profiler, so at most one sampled trace profiles at a time
+_profiling = threading.Lock()
+
+# Stage spans for the answer pipeline. Every span feeds a per-stage histogram (Prometheus text via
+# prometheus_text()); spans inside a trace() are also kept on that trace for the debug view. When the OpenTelemetry
+# API is installed and TRACE_OTEL=1 each span is mirrored to it, so any configured OTel SDK/exporter receives them.
+TRACE_KEEP = int(os.getenv("TRACE_KEEP", "50"))                          # recent traces kept for the debug view
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))       # share of sync traces run under cProfile
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")                              # also dump sampled .prof files here
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+try:
+    if os.getenv("TRACE_OTEL", "0") != "1": raise ImportError
+    from opentelemetry import trace as _otel_trace
+    _otel = _otel_trace.get_tracer("banking-copilot")
+except ImportError:
+    _otel = None
+
+@dataclass
+class Span:
+    name: str
+    start_ms: float           # offset from the start of its trace
+    ms: float = 0.0
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+@dataclass
+class Trace:
+    name: str
+    started: float = field(default_factory=time.time)
+    t0: float = field(default_factory=time.perf_counter)
+    spans: List[Span] = field(default_factory=list)
+    ms: float = 0.0
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    profile: Optional[str] = None      # top functions by cumulative time when this trace was sampled
+
+class _Stage:
+    __slots__ = ("counts", "sum_ms", "n", "errors", "recent")
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.sum_ms, self.n = 0.0, 0
+        self.errors: Dict[str, int] = {}
+        self.recent: Deque[float] = deque(maxlen=2048)
+
+class Tracer:
+    def __init__(self, keep: int = TRACE_KEEP, profile_rate: float = PROFILE_SAMPLE_RATE):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, _Stage] = {}
+        self._events: Dict[str, int] = {}
+        self._current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+        self.traces: Deque[Trace] = deque(maxlen=keep)
+        self.profile_rate = profile_rate
+
+    def _stage(self, name: str) -> _Stage:
+        st = self._stages.get(name)
+        if st is None:
+            with self._lock: st = self._stages.setdefault(name, _Stage())
+        return st
+
+    def observe(self, name: str, ms: float):
+        st = self._stage(name)
+        with self._lock:
+            st.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+            st.sum_ms += ms; st.n += 1; st.recent.append(ms)
+
+    def incr(self, event: str, n: int = 1):
+        with self._lock: self._events[event] = self._events.get(event, 0) + n
+
+    def error(self, name: str, exc: BaseException):
+        # counts (and logs) an exception for a stage, including ones the caller handles and swallows
+        st = self._stage(name)
+        kind = type(exc).__name__
+        with self._lock: st.errors[kind] = st.errors.get(kind, 0) + 1
+        log.warning("%s failed: %s: %s", name, kind, exc)
+        tr = self._current.get()
+        if tr is not None: tr.spans.append(Span(name, (time.perf_counter() - tr.t0) * 1000, error=f"{kind}: {exc}"))
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Span]:
+        tr = self._current.get()
+        t0 = time.perf_counter()
+        sp = Span(name, (t0 - tr.t0) * 1000 if tr is not None else 0.0, attrs=attrs)
+        otel = _otel.start_as_current_span(name, attributes={k: str(v) for k, v in attrs.items()}) if _otel else None
+        if otel is not None: otel.__enter__()
+        try:
+            yield sp
+        except BaseException as e:
+            sp.error = f"{type(e).__name__}: {e}"
+            st = self._stage(name)
+            with self._lock: st.errors[type(e).__name__] = st.errors.get(type(e).__name__, 0) + 1
+            raise
+        finally:
+            sp.ms = (time.perf_counter() - t0) * 1000
+            self.observe(name, sp.ms)
+            if tr is not None: tr.spans.append(sp)
+            if otel is not None: otel.__exit__(None, None, None)
+
+    def _start_profile(self) -> Optional[cProfile.Profile]:
+        # Only sync callers (Streamlit, CLI, worker threads) are sampled: on an event loop thread the profile would
+        # also pick up every other request's coroutine work interleaved with this one.
+        if not self.profile_rate or random.random() >= self.profile_rate: return None
+        try:
+            asyncio.get_running_loop(); return None
+        except RuntimeError:
+            pass
+        if not _profiling.acquire(blocking=False): return None
+        prof = cProfile.Profile()
+        try:
+            prof.enable(); return prof
+        except ValueError:   # a profiler outside ours is active on this thread
+            _profiling.release(); return None
+
+    @contextmanager
+    def trace(self, name: str, profile: bool = True, **attrs) -> Iterator[Trace]:
+        # root of one request; nested span() calls (same context, or copied into worker threads) attach to it.
+        # profile=False for traces that suspend mid-way (generators), whose profile would include the consumer.
+        tr = Trace(name, attrs=attrs)
+        token = self._current.set(tr)
+        prof = self._start_profile() if profile else None
+        try:
+            with self.span(name):
+                yield tr
+        finally:
+            tr.ms = (time.perf_counter() - tr.t0) * 1000
+            if prof is not None:
+                prof.disable(); _profiling.release()
+                tr.profile = _profile_text(prof)
+                if PROFILE_DIR:
+                    os.makedirs(PROFILE_DIR, exist_ok=True)
+                    prof.dump_stats(os.path.join(PROFILE_DIR, f"{name}-{int(tr.started * 1000)}.prof"))
+            try: self._current.reset(token)
+            except ValueError: self._current.set(None)   # generator finished in a different context
+            self.traces.append(tr)
+
+    def current(self) -> Optional[Trace]:
+        return self._current.get()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        with self._lock:
+            for name, st in sorted(self._stages.items()):
+                r = sorted(st.recent)
+                q = lambda p: round(r[min(len(r) - 1, int(p * len(r)))], 2) if r else None
+                out[name] = {"count": st.n, "errors": dict(st.errors), "mean_ms": round(st.sum_ms / st.n, 2) if st.n else None,
+                             "p50_ms": q(0.5), "p95_ms": q(0.95), "max_ms": round(r[-1], 2) if r else None}
+        return out
+
+    def events(self) -> Dict[str, int]:
+        with self._lock: return dict(self._events)
+
+    def prometheus_text(self, prefix: str = "copilot") -> str:
+        lines = [f"# HELP {prefix}_stage_seconds Latency of answer pipeline stages.",
+                 f"# TYPE {prefix}_stage_seconds histogram"]
+        errs = [f"# HELP {prefix}_stage_errors_total Exceptions raised or swallowed per stage.",
+                f"# TYPE {prefix}_stage_errors_total counter"]
+        evs = [f"# HELP {prefix}_events_total Pipeline events (e.g. JSON repaired).",
+               f"# TYPE {prefix}_events_total counter"]
+        with self._lock:
+            for name, st in sorted(self._stages.items()):
+                acc = 0
+                for le, c in zip(list(BUCKETS_MS) + ["+Inf"], st.counts):
+                    acc += c
+                    le_s = "+Inf" if le == "+Inf" else repr(le / 1000)
+                    lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{le_s}"}} {acc}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {st.sum_ms / 1000:.6f}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {st.n}')
+                for kind, n in sorted(st.errors.items()):
+                    errs.append(f'{prefix}_stage_errors_total{{stage="{name}",type="{kind}"}} {n}')
+            evs += [f'{prefix}_events_total{{event="{e}"}} {n}' for e, n in sorted(self._events.items())]
+        return "\n".join(lines + errs + evs) + "\n"
+
+    def reset(self):
+        with self._lock: self._stages.clear(); self._events.clear()
+        self.traces.clear()
+
+def _profile_text(prof: cProfile.Profile, top: int = 25) -> str:
+    buf = io.StringIO()
+    pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(top)
+    return buf.getvalue()
+
+TRACER = Tracer()
+span, trace = TRACER.span, TRACER.trace
@@ -0,0 +1,192 @@
+"""Benchmark suite for the core hot paths on a synthetic data directory, with JSON results for regression checks.
+
+    python -m scripts.bench --transactions 1000000 --json bench/$(git rev-parse --short HEAD).json
+    python -m scripts.bench --data ./data_1m --json new.json --compare old.json --threshold 1.2
+
+Covers load_corpus, index build/resync (FaissStore.sync over the rendered corpus), FaissStore.search (plain and
+type-filtered), TransactionTable build, metrics.total_interest_*, build_daily_balances_tz and
+monthly_interest_from_daily. Index build uses a seeded hash embedder by default so the numbers measure our code,
+not the sentence-transformer; --embed model uses the real one. --compare exits 1 if any median slowed down by more
+than --threshold (rows with fewer than 3 samples are reported but not gated).
+"""
+import argparse, json, os, platform, subprocess, sys, tempfile, time
+from datetime import datetime, timezone
+from itertools import islice
+import numpy as np, faiss
+from app.core.rag.faiss_store import FaissStore, _l2_normalize, content_hash
+from app.core.txn_table import TransactionTable
+from app.services.indexer import corpus_records, index_items
+from app.services.interest_calc import build_daily_balances_tz, monthly_interest_from_daily
+from app.services.metrics import total_interest_all, total_interest_month, total_interest_year
+from app.utils.loader import load_corpus
+from scripts.gen_data import generate
+
+def _timeit(fn, repeat: int, number: int = 1):
+    # -> (per-call ms for each repeat, last result)
+    out, res = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number): res = fn()
+        out.append((time.perf_counter() - t0) * 1000 / number)
+    return out, res
+
+def _row(name: str, ms, **extra) -> dict:
+    ms = np.asarray(ms, dtype="float64")
+    row = {"bench": name, "repeat": int(len(ms)), "min_ms": round(float(ms.min()), 4),
+           "median_ms": round(float(np.median(ms)), 4), "p95_ms": round(float(np.percentile(ms, 95)), 4), **extra}
+    print(json.dumps(row), flush=True)
+    return row
+
+def hash_embedder(dim: int, n_clusters: int = 256, seed: int = 0):
+    # deterministic stand-in for the sentence embedder: text -> clustered unit vector keyed by its content hash
+    centers = np.random.default_rng(seed).standard_normal((n_clusters, dim)).astype("float32")
+    def embed(texts):
+        h = np.fromiter((content_hash(t) for t in texts), dtype="uint64", count=len(texts))
+        noise = np.random.default_rng(int(h[0]) if len(h) else 0).standard_normal((len(texts), dim)).astype("float32")
+        return _l2_normalize(centers[(h % n_clusters).astype("int64")] + 0.35 * noise).astype("float32")
+    return embed
+
+def bench_load(data_dir: str, repeat: int):
+    ms, corpus = _timeit(lambda: load_corpus(data_dir), repeat)
+    rows = {k: len(v) for k, v in corpus.items() if isinstance(v, list) and k != "rejected"}
+    return [_row("load_corpus", ms, rows=rows)], corpus
+
+def bench_txn_table(corpus, repeat: int):
+    txs = corpus["transactions"]
+    ms, _ = _timeit(lambda: TransactionTable.from_records(txs), repeat)
+    return [_row("txn_table_build", ms, n=len(txs))]
+
+def bench_metrics(corpus, now: datetime, repeat: int, number: int):
+    txs, out = corpus["transactions"], []
+    for name, fn in (("all", total_interest_all), ("year", lambda t: total_interest_year(t, now)),
+                     ("month", lambda t: total_interest_month(t, now))):
+        # first call per table (builds the per-category prefix sums); the tables are built outside the timer
+        fresh = iter([TransactionTable.from_records(txs) for _ in range(repeat)])
+        ms, _ = _timeit(lambda: fn(next(fresh)), repeat)
+        out.append(_row(f"total_interest_{name}_cold", ms, n=len(txs)))
+        tbl = TransactionTable.from_records(txs); fn(tbl)
+        ms, (total, ev) = _timeit(lambda: fn(tbl), repeat, number)
+        out.append(_row(f"total_interest_{name}", ms, n=len(txs), evidence=len(ev)))
+    return out
+
+def bench_interest(corpus, apr: float, repeat: int, number: int):
+    tbl, out = corpus["txn_table"], []
+    ts = tbl.posted()[0]
+    if not len(ts): return out
+    first, last = (datetime.fromtimestamp(int(x), timezone.utc).date() for x in (ts[0], ts[-1]))
+    month = (datetime.combine(last.replace(day=1), datetime.min.time()), datetime.combine(last, datetime.min.time()))
+    span = (datetime.combine(first, datetime.min.time()), datetime.combine(last, datetime.min.time()))
+    for label, (s, e) in (("month", month), ("full", span)):
+        ms, daily = _timeit(lambda: build_daily_balances_tz(tbl, s, e), repeat, number)
+        out.append(_row(f"daily_balances_{label}", ms, days=len(daily)))
+        for rounding in ("sum_then_round", "daily_then_sum"):
+            ms, _ = _timeit(lambda: monthly_interest_from_daily(daily, apr, 365, rounding), repeat, number)
+            out.append(_row(f"monthly_interest_{label}_{rounding}", ms, days=len(daily)))
+    return out
+
+def bench_index(corpus, limit: int, embed: str, dim: int, kind: str, queries: int, k: int, seed: int, repeat: int):
+    out = []
+    items = list(islice(index_items(corpus_records(corpus)), limit or None))
+    if embed == "model":
+        from app.services.embedder import embed_texts, embedding_dim
+        fn, dim = embed_texts, embedding_dim()
+    else:
+        fn = hash_embedder(dim, seed=seed)
+    def build():
+        st = FaissStore(dim, config={"kind": kind}); st.sync(items, embed=fn); return st
+    ms, store = _timeit(build, repeat)
+    out.append(_row("index_build", ms, n=len(items), kind=store.kind, embed=embed))
+    ms, stats = _timeit(lambda: store.sync(items, embed=fn), repeat)
+    out.append(_row("index_resync_unchanged", ms, n=len(items), stats=stats))
+    with tempfile.TemporaryDirectory() as d:
+        ms, _ = _timeit(lambda: store.save(d), repeat)
+        out.append(_row("index_save", ms, n=len(items)))
+        ms, _ = _timeit(lambda: FaissStore.load(d, config={"kind": kind}), repeat)
+        out.append(_row("index_load", ms, n=len(items)))
+    rng = np.random.default_rng(seed + 1)
+    texts = [items[i][1] for i in rng.integers(0, len(items), queries)]
+    q = fn(texts)
+    subsets = {"all": None}
+    for rtype in ("payments", "transactions", "statements"):
+        ids = store.ids_for(rtype)
+        if len(ids): subsets[rtype] = ids
+    for label, ids in subsets.items():
+        lat = []
+        for i in range(len(q)):
+            t0 = time.perf_counter(); store.search(q[i:i+1], k, ids=ids); lat.append((time.perf_counter() - t0) * 1000)
+        out.append(_row(f"search_{label}", lat, n=len(store), subset=None if ids is None else int(len(ids)), k=k))
+    return out
+
+def _git_rev() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+MIN_GATE_REPEAT = 3   # rows with fewer samples are shown by compare() but cannot fail it
+
+def compare(new: dict, old: dict, threshold: float) -> list:
+    # -> benchmarks whose median grew by more than threshold x; prints a side-by-side table
+    before = {r["bench"]: r for r in old["results"]}
+    slower = []
+    print(f"\n{'bench':<44}{'old ms':>12}{'new ms':>12}{'ratio':>8}")
+    for r in new["results"]:
+        o = before.get(r["bench"])
+        if o is None: continue
+        ratio = r["median_ms"] / o["median_ms"] if o["median_ms"] else float("inf")
+        gated = min(r["repeat"], o["repeat"]) >= MIN_GATE_REPEAT
+        flag = ("  <-- slower" if gated else "  (too few samples to gate)") if ratio > threshold else ""
+        print(f"{r['bench']:<44}{o['median_ms']:>12.3f}{r['median_ms']:>12.3f}{ratio:>8.2f}{flag}")
+        if gated and ratio > threshold: slower.append(r["bench"])
+    return slower
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data", default=None, help="existing data dir (skips generation)")
+    ap.add_argument("--transactions", type=int, default=200_000)
+    ap.add_argument("--months", type=int, default=24)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--number", type=int, default=20, help="calls per repeat for the sub-millisecond benchmarks")
+    ap.add_argument("--index-rows", type=int, default=200_000, help="cap on indexed records (0 = all)")
+    ap.add_argument("--index-repeat", type=int, default=3, help="builds/resyncs/saves/loads timed per index benchmark")
+    ap.add_argument("--embed", choices=("hash", "model"), default="hash")
+    ap.add_argument("--dim", type=int, default=384, help="vector size for --embed hash")
+    ap.add_argument("--kind", default="flat", help="FAISS backend: flat|ivf|hnsw|ivfpq")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("-k", type=int, default=8)
+    ap.add_argument("--only", default="", help="comma list of groups: load,table,metrics,interest,index")
+    ap.add_argument("--json", default=None, help="write results here")
+    ap.add_argument("--compare", default=None, help="earlier results JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=1.2)
+    a = ap.parse_args()
+    groups = set(a.only.split(",")) if a.only else {"load", "table", "metrics", "interest", "index"}
+    data_dir = a.data
+    if not data_dir:
+        data_dir = tempfile.mkdtemp(prefix="bench_data_")
+        t0 = time.perf_counter(); generate(data_dir, a.transactions, a.months, a.seed)
+        print(f"generated {data_dir} in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    results, corpus = [], None
+    rows, corpus = bench_load(data_dir, a.repeat if "load" in groups else 1)
+    if "load" in groups: results += rows
+    now = datetime.fromtimestamp(int(corpus["txn_table"].ts[-1]), timezone.utc) if len(corpus["txn_table"]) else datetime.now(timezone.utc)
+    apr = corpus["account_summary"][0].purchaseApr if corpus["account_summary"] else 19.99
+    if "table" in groups: results += bench_txn_table(corpus, a.repeat)
+    if "metrics" in groups: results += bench_metrics(corpus, now, a.repeat, a.number)
+    if "interest" in groups: results += bench_interest(corpus, apr, a.repeat, a.number)
+    if "index" in groups:
+        results += bench_index(corpus, a.index_rows, a.embed, a.dim, a.kind, a.queries, a.k, a.seed, a.index_repeat)
+    doc = {"meta": {"git": _git_rev(), "when": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "python": platform.python_version(), "numpy": np.__version__, "faiss": faiss.__version__,
+                    "machine": platform.machine(), "cpus": os.cpu_count(), "data": a.data or "generated",
+                    "transactions": len(corpus["transactions"]), "seed": a.seed, "args": vars(a)},
+           "results": results}
+    if a.json:
+        os.makedirs(os.path.dirname(os.path.abspath(a.json)), exist_ok=True)
+        with open(a.json, "w") as f: json.dump(doc, f, indent=2)
+    if a.compare:
+        with open(a.compare) as f: slower = compare(doc, json.load(f), a.threshold)
+        if slower: sys.exit(1)
+
+if __name__ == "__main__":
+    main()
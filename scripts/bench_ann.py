@@ -0,0 +1,72 @@
+"""Recall/latency/memory benchmark for the FaissStore index backends on synthetic corpora.
+
+    python -m scripts.bench_ann --sizes 10000,100000,1000000 --json bench_ann.json
+"""
+import argparse, json, time, numpy as np, faiss
+from app.core.rag.faiss_store import FaissStore, _l2_normalize
+
+def synthetic(n: int, dim: int, seed: int = 0, n_clusters: int = 256, chunk: int = 100_000) -> np.ndarray:
+    # clustered vectors look more like sentence embeddings than uniform noise does
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype("float32")
+    out = np.empty((n, dim), dtype="float32")
+    for s in range(0, n, chunk):
+        m = min(chunk, n - s)
+        out[s:s+m] = centers[rng.integers(0, n_clusters, m)] + 0.35 * rng.standard_normal((m, dim)).astype("float32")
+    return _l2_normalize(out).astype("float32")
+
+def _latencies(index, q: np.ndarray, k: int):
+    lat = []
+    for i in range(len(q)):
+        t = time.perf_counter(); index.search(q[i:i+1], k); lat.append((time.perf_counter() - t) * 1000)
+    return float(np.percentile(lat, 50)), float(np.percentile(lat, 99))
+
+def _recall(found: np.ndarray, truth: np.ndarray) -> float:
+    k = truth.shape[1]
+    return float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found.tolist(), truth.tolist())]))
+
+def run(sizes, dim, nq, k, nprobes, efs, kinds, seed=0):
+    rows = []
+    for n in sizes:
+        xb = synthetic(n, dim, seed)
+        xq = synthetic(nq, dim, seed + 1)
+        ids = np.arange(n, dtype="int64")
+        flat = faiss.IndexFlatIP(dim); flat.add(xb)
+        _, truth = flat.search(xq, k)
+        for kind in kinds:
+            st = FaissStore(dim, config={"kind": kind})
+            t0 = time.perf_counter(); st.train(xb); t_train = time.perf_counter() - t0
+            t0 = time.perf_counter(); st.index.add_with_ids(xb, ids); t_add = time.perf_counter() - t0
+            mem = int(faiss.serialize_index(st.index).nbytes)
+            sweep = [("nprobe", v) for v in nprobes] if st.kind in ("ivf", "ivfpq") else \
+                    [("ef_search", v) for v in efs] if st.kind == "hnsw" else [("-", None)]
+            for knob, val in sweep:
+                if knob != "-": st.set_search_params(**{knob: val})
+                _, found = st.index.search(xq, k)
+                p50, p99 = _latencies(st.index, xq, k)
+                row = {"n": n, "dim": dim, "kind": st.kind, knob: val, "recall@k": round(_recall(found, truth), 4),
+                       "k": k, "p50_ms": round(p50, 3), "p99_ms": round(p99, 3), "index_bytes": mem,
+                       "bytes_per_vec": round(mem / n, 1), "train_s": round(t_train, 3), "add_s": round(t_add, 3)}
+                rows.append(row); print(json.dumps(row), flush=True)
+            del st
+        del xb, flat
+    return rows
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("-k", type=int, default=10)
+    ap.add_argument("--kinds", default="flat,ivf,hnsw,ivfpq")
+    ap.add_argument("--nprobe", default="1,8,32")
+    ap.add_argument("--ef-search", default="16,64,128")
+    ap.add_argument("--json", default=None, help="write all rows to this file")
+    a = ap.parse_args()
+    ints = lambda s: [int(x) for x in s.split(",") if x]
+    rows = run(ints(a.sizes), a.dim, a.queries, a.k, ints(a.nprobe), ints(a.ef_search), a.kinds.split(","))
+    if a.json:
+        with open(a.json, "w") as f: json.dump(rows, f, indent=2)
+
+if __name__ == "__main__":
+    main()
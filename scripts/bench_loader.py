@@ -0,0 +1,55 @@
+"""Load time and peak RSS of the streaming loader vs the legacy json.load + per-row model + dict path.
+
+    python -m scripts.bench_loader --rows 1000000
+"""
+import argparse, dataclasses, json, os, random, resource, tempfile, time
+import multiprocessing as mp
+from pydantic import TypeAdapter
+from app.core.schemas import Transaction
+from app.utils.loader import load_corpus
+
+def write_transactions(path: str, n: int, seed: int = 0):
+    rng = random.Random(seed)
+    types = ["PURCHASE", "PAYMENT", "INTEREST", "FEE", "REFUND"]
+    with open(path, "w") as f:
+        f.write("[\n")
+        for i in range(n):
+            row = {"transactionId": f"t-{i:08d}", "transactionType": rng.choice(types), "transactionStatus": "POSTED",
+                   "transactionDateTime": f"2024-{rng.randint(1,12):02d}-{rng.randint(1,28):02d}T12:00:00Z",
+                   "amount": round(rng.uniform(1, 500), 2), "endingBalance": round(rng.uniform(0, 9000), 2)}
+            f.write(("," if i else "") + json.dumps(row) + "\n")
+        f.write("]\n")
+
+def _legacy(data_dir: str) -> int:
+    # what load_corpus did before: whole-file json.load, one model per row, then back to a dict
+    one = TypeAdapter(Transaction)
+    with open(os.path.join(data_dir, "transactions.json")) as f: items = json.load(f)
+    out = []
+    for it in items:
+        try: out.append(dataclasses.asdict(one.validate_python(it)))
+        except Exception: continue
+    return len(out)
+
+def _streaming(data_dir: str) -> int:
+    return len(load_corpus(data_dir)["transactions"])
+
+def _measure(fn_name: str, data_dir: str, q):
+    fn = {"legacy": _legacy, "streaming": _streaming}[fn_name]
+    t0 = time.perf_counter(); n = fn(data_dir); dt = time.perf_counter() - t0
+    q.put({"loader": fn_name, "rows": n, "seconds": round(dt, 2),
+           "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)})
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--data", default=None, help="existing data dir with transactions.json (skips generation)")
+    a = ap.parse_args()
+    data_dir = a.data or tempfile.mkdtemp(prefix="bench_loader_")
+    if not a.data: write_transactions(os.path.join(data_dir, "transactions.json"), a.rows)
+    ctx = mp.get_context("spawn")  # fresh process per loader so ru_maxrss is not shared
+    for name in ("legacy", "streaming"):
+        q = ctx.Queue(); p = ctx.Process(target=_measure, args=(name, data_dir, q)); p.start()
+        print(json.dumps(q.get())); p.join()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Offline retrieval eval over labelled questions: hit rate, recall, MRR and latency per retrieval mode.
+
+    NOW_UTC=2025-09-15T00:00:00Z python -m scripts.eval_retrieval --data ./data --k 6 --json eval_retrieval.json
+
+Questions file: JSON Lines with {"q": question, "expect": ["<rtype>:<record id>", ...]}.
+"""
+import argparse, json, os, numpy as np
+from app.core.rag.retriever import HybridRetriever, QueryFilter, RETRIEVAL_MODES
+from app.services.embedder import embed_texts
+from app.services.indexer import DOC_TYPES, corpus_records, sync_index
+from app.utils.loader import load_corpus
+from app.utils.now import now_utc
+
+QUESTIONS = os.path.join(os.path.dirname(__file__), "retrieval_questions.jsonl")
+
+def evaluate(retriever: HybridRetriever, corpus, questions, k: int, mode: str, now, prefilter: bool = True) -> dict:
+    key = lambda p: f"{p['rtype']}:{getattr(corpus[p['rtype']][p['rid']], DOC_TYPES[p['rtype']])}"
+    hits = recall = rr = 0.0
+    lat, cand, misses = [], [], []
+    flt = None if prefilter else QueryFilter()
+    retriever.search(questions[0]["q"], k=k, now=now, mode=mode)  # warm the query encoder
+    for item in questions:
+        found = [key(p) for _, p in retriever.search(item["q"], k=k, now=now, mode=mode, flt=flt)]
+        st = retriever.last
+        lat.append(st.ms); cand.append(st.candidates)
+        want = set(item["expect"])
+        ranks = [i for i, f in enumerate(found) if f in want]
+        hits += bool(ranks); recall += len(want & set(found)) / len(want); rr += 1.0 / (ranks[0] + 1) if ranks else 0.0
+        if not ranks: misses.append({"q": item["q"], "expect": item["expect"], "found": found})
+    n = len(questions)
+    return {"mode": mode, "prefilter": prefilter, "k": k, "questions": n, f"hit@{k}": round(hits / n, 3), f"recall@{k}": round(recall / n, 3),
+            "mrr": round(rr / n, 3), "p50_ms": round(float(np.percentile(lat, 50)), 2),
+            "p95_ms": round(float(np.percentile(lat, 95)), 2), "mean_candidates": round(float(np.mean(cand)), 1),
+            "misses": misses}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data", default="./data")
+    ap.add_argument("--questions", default=QUESTIONS)
+    ap.add_argument("--k", type=int, default=6)
+    ap.add_argument("--modes", default=",".join(RETRIEVAL_MODES))
+    ap.add_argument("--no-prefilter", action="store_true", help="skip type/date filtering (baseline)")
+    ap.add_argument("--json", default=None)
+    a = ap.parse_args()
+    corpus = load_corpus(a.data)
+    store, _ = sync_index(corpus_records(corpus))
+    retriever = HybridRetriever(store, corpus, embed_texts)
+    with open(a.questions) as f: questions = [json.loads(l) for l in f if l.strip()]
+    now = now_utc()
+    rows = [evaluate(retriever, corpus, questions, a.k, m, now, not a.no_prefilter) for m in a.modes.split(",")]
+    for r in rows:
+        print(f"{r['mode']:>7}  hit@{a.k}={r[f'hit@{a.k}']:.3f}  recall@{a.k}={r[f'recall@{a.k}']:.3f}  mrr={r['mrr']:.3f}  "
+              f"p50={r['p50_ms']:.2f}ms  p95={r['p95_ms']:.2f}ms  candidates={r['mean_candidates']}")
+    if a.json:
+        with open(a.json, "w") as f: json.dump(rows, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Bulk agreement extraction: every *.pdf under a directory -> <stem>.agreement.json with per-file timing.
+
+    python -m scripts.extract_agreements --root ./agreements --out ./out/agreements --workers 8
+
+Per-file results stream to results.jsonl in --out (or the current directory); a summary is printed at the end.
+Re-runs only re-extract PDFs whose content changed.
+"""
+import argparse, json, os, time
+from app.services.agreement_extractor import extract_dir
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", required=True)
+    ap.add_argument("--out", default=None, help="directory for the JSON files (default: next to each PDF)")
+    ap.add_argument("--workers", type=int, default=0, help="processes (default: all CPUs)")
+    ap.add_argument("--chunksize", type=int, default=8)
+    a = ap.parse_args()
+    if a.out: os.makedirs(a.out, exist_ok=True)
+    t0 = time.perf_counter()
+    n = errors = 0; secs = []
+    with open(os.path.join(a.out or ".", "results.jsonl"), "w") as f:
+        for r in extract_dir(a.root, a.out, a.workers, a.chunksize):
+            n += 1; errors += bool(r["error"]); secs.append(r["seconds"])
+            f.write(json.dumps(r) + "\n")
+    dt = time.perf_counter() - t0
+    secs.sort()
+    print(json.dumps({"files": n, "errors": errors, "seconds": round(dt, 2), "files_per_s": round(n / dt, 1) if dt else None,
+                      "p50_file_s": secs[len(secs) // 2] if secs else None,
+                      "max_file_s": secs[-1] if secs else None}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Seeded synthetic data directory (account_summary / statements / payments / transactions) at any scale.
+
+    python -m scripts.gen_data --out ./data_1m --transactions 1000000 --months 36 --seed 7
+
+The ledger is self-consistent: endingBalance is the running POSTED balance, one INTEREST row is posted at each month
+end from that balance, statements summarise each month and every PAYMENT transaction has a matching payment row
+(plus two SCHEDULED ones after the window). Same arguments + seed -> byte-identical files.
+"""
+import argparse, json, os, time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+
+TYPES = ("PURCHASE", "PAYMENT", "REFUND", "FEE", "CASH_ADVANCE")
+TYPE_P = (0.82, 0.08, 0.04, 0.03, 0.03)
+CREDIT = {"PAYMENT", "REFUND"}
+PENDING_SHARE = 0.02
+
+def _iso(ts: int) -> str:
+    return datetime.fromtimestamp(int(ts), timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _month_starts(start: datetime, months: int) -> np.ndarray:
+    out, y, m = [], start.year, start.month
+    for _ in range(months + 1):
+        out.append(int(datetime(y, m, 1, tzinfo=timezone.utc).timestamp()))
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return np.array(out, dtype="int64")
+
+class _JsonArray:
+    # streams one JSON array, a row per line, without holding the rows
+    def __init__(self, path: str):
+        self.f, self.n = open(path, "w"), 0
+    def write(self, row: dict):
+        self.f.write(("[\n" if not self.n else ",\n") + json.dumps(row, separators=(",", ":")))
+        self.n += 1
+    def close(self):
+        self.f.write("\n]\n" if self.n else "[]\n"); self.f.close()
+
+def generate(out_dir: str, transactions: int = 100_000, months: int = 24, seed: int = 0, start: str = "2023-01-01",
+             apr: float = 19.99, credit_limit: float = 25_000.0) -> dict:
+    # -> row counts per file. Rows are generated month by month, so memory stays at one month of the ledger.
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    edges = _month_starts(datetime.fromisoformat(start).replace(tzinfo=timezone.utc), months)
+    per_month = np.bincount(rng.integers(0, months, transactions), minlength=months)
+    tx, st, pay = (_JsonArray(os.path.join(out_dir, f"{n}.json")) for n in ("transactions", "statements", "payments"))
+    bal, n_tx, last = 0, 0, None   # balance in cents
+    for m in range(months):
+        lo, hi, n = int(edges[m]), int(edges[m + 1]), int(per_month[m])
+        ts = np.sort(rng.integers(lo, hi - 3, n))
+        kind = rng.choice(len(TYPES), n, p=TYPE_P)
+        cents = np.maximum(np.round(rng.lognormal(3.6, 1.0, n) * 100), 1).astype("int64")
+        pending = rng.random(n) < PENDING_SHARE
+        sign = np.where(np.isin(kind, [TYPES.index(t) for t in CREDIT]), -1, 1)
+        # payments pay off 60-100% of what is owed by month end, so the balance stays bounded at any row count
+        paid = (kind == TYPES.index("PAYMENT")) & ~pending
+        if paid.any():
+            owed = bal + int((sign * cents)[~pending & ~paid].sum())
+            w = rng.random(int(paid.sum())) + 0.1
+            cents[paid] = np.maximum(2_500, np.round(max(0, owed) * rng.uniform(0.6, 1.0) * w / w.sum()))
+        delta = np.where(pending, 0, sign * cents)
+        ending = bal + np.cumsum(delta)
+        tot = {t: int(cents[(kind == i) & ~pending].sum()) for i, t in enumerate(TYPES)}
+        for i in range(n):
+            t = TYPES[kind[i]]
+            tid = f"t-{n_tx:09d}"; n_tx += 1
+            stamp = _iso(ts[i])
+            tx.write({"transactionId": tid, "transactionType": t, "transactionStatus": "PENDING" if pending[i] else "POSTED",
+                      "transactionDateTime": stamp, "amount": cents[i] / 100, "endingBalance": int(ending[i]) / 100})
+            if t == "PAYMENT" and not pending[i]:
+                pay.write({"paymentId": f"p-{tid}", "state": "POSTED", "paymentDateTime": stamp, "effectiveDateTime": stamp,
+                           "amount": cents[i] / 100, "fundingSource": [{"fundingType": "ACH", "last4Account": f"{rng.integers(10_000):04d}"}]})
+        bal = int(ending[-1]) if n else bal
+        interest = max(0, round(bal * apr / 1200))
+        close = _iso(hi - 3)
+        if interest:
+            bal += interest
+            tx.write({"transactionId": f"int-{n_tx:09d}", "transactionType": "INTEREST", "transactionStatus": "POSTED",
+                      "transactionDateTime": close, "amount": interest / 100, "endingBalance": bal / 100})
+            n_tx += 1
+        due = datetime.fromtimestamp(hi, timezone.utc) + timedelta(days=24)
+        st.write({"statementId": f"st-{close[:7]}", "openingDateTime": _iso(lo), "closingDateTime": close,
+                  "dueDate": due.strftime("%Y-%m-%d"), "purchases": (tot["PURCHASE"] + tot["CASH_ADVANCE"]) / 100,
+                  "paymentsAndCredits": (tot["PAYMENT"] + tot["REFUND"]) / 100, "interestCharged": interest / 100,
+                  "feesCharged": tot["FEE"] / 100, "minimumPaymentDue": max(25.0, round(bal * 0.01 / 100, 2)) if bal > 0 else 0.0,
+                  "unpaidBalance": bal / 100})
+        last = (lo, hi - 3)
+    for d in (7, 21):
+        when = _iso(int(edges[-1]) + d * 86_400)
+        pay.write({"paymentId": f"p-sched-{d}", "state": "SCHEDULED", "paymentDateTime": _iso(int(edges[-1])),
+                   "effectiveDateTime": when, "amount": 100.0, "fundingSource": [{"fundingType": "ACH", "last4Account": "0000"}]})
+    counts = {"transactions": tx.n, "statements": st.n, "payments": pay.n, "account_summary": 1}
+    for a in (tx, st, pay): a.close()
+    with open(os.path.join(out_dir, "account_summary.json"), "w") as f:
+        json.dump([{"accountId": f"acc-{seed:06d}", "creditLimit": credit_limit,
+                    "availableCredit": round(max(0.0, credit_limit - bal / 100), 2), "currentBalance": bal / 100,
+                    "statementBalance": bal / 100, "purchaseApr": apr, "highestPriorityStatus": "CURRENT",
+                    "billingCycleOpenDateTime": _iso(last[0]) if last else None,
+                    "billingCycleCloseDateTime": _iso(last[1]) if last else None}], f, indent=2)
+    return counts
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", required=True)
+    ap.add_argument("--transactions", type=int, default=100_000)
+    ap.add_argument("--months", type=int, default=24, help="ledger span; one statement per month")
+    ap.add_argument("--start", default="2023-01-01")
+    ap.add_argument("--apr", type=float, default=19.99)
+    ap.add_argument("--seed", type=int, default=0)
+    a = ap.parse_args()
+    t0 = time.perf_counter()
+    counts = generate(a.out, a.transactions, a.months, a.seed, a.start, a.apr)
+    print(json.dumps({**counts, "seconds": round(time.perf_counter() - t0, 2), "out": a.out}))
+
+if __name__ == "__main__":
+    main()
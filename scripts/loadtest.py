@@ -0,0 +1,117 @@
+"""Closed-loop load test for the HTTP API: N concurrent clients for a fixed duration, reporting RPS and latency percentiles.
+
+    # against a running server
+    python -m scripts.loadtest --url http://127.0.0.1:8000 --concurrency 32 --duration 30
+    # self-contained: starts the stub LLM and `uvicorn app.server:api` in subprocesses first
+    python -m scripts.loadtest --spawn --stub-latency-ms 300 --concurrency 32 --duration 30 --json loadtest.json
+"""
+import argparse, http.client, json, os, random, socket, subprocess, sys, threading, time, urllib.parse
+import numpy as np
+
+QUESTIONS = [
+    "what is the total interest this year",
+    "are there any scheduled payments?",
+    "when was my last payment?",
+    "what is my current balance?",
+    "what is my minimum payment?",
+    "why was I charged interest in July?",
+    "what do I pay to avoid more interest?",
+    "explain the fees on my August statement",
+]
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0)); return s.getsockname()[1]
+
+def _wait(url: str, timeout: float):
+    u = urllib.parse.urlparse(url); end = time.time() + timeout
+    while time.time() < end:
+        try:
+            c = http.client.HTTPConnection(u.hostname, u.port, timeout=2); c.request("GET", "/healthz")
+            if c.getresponse().status == 200: return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{url} not healthy after {timeout}s")
+
+def spawn(stub_latency_ms: float, api_port: int, env_extra: dict, llm_cache: bool = False):
+    # stub LLM + API server as subprocesses so the load generator does not share their GIL
+    stub_port = _free_port()
+    stub = subprocess.Popen([sys.executable, "-m", "scripts.stub_llm", "--port", str(stub_port),
+                             "--latency-ms", str(stub_latency_ms)], stdout=subprocess.DEVNULL)
+    env = {**os.environ, "OPENAI_BASE_URL": f"http://127.0.0.1:{stub_port}/v1", "LLM_CACHE_PATH": "", **env_extra}
+    if not llm_cache: env["LLM_CACHE_MEM_ITEMS"] = "0"   # every LLM-bound question pays the stub latency
+    srv = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.server:api", "--port", str(api_port),
+                            "--log-level", "warning"], env=env)
+    return [stub, srv]
+
+def _client(url: str, questions, mix_interest: float, stop: float, out: list, lock: threading.Lock, seed: int):
+    u = urllib.parse.urlparse(url); rng = random.Random(seed)
+    conn, lat, codes = None, [], {}
+    while time.perf_counter() < stop:
+        if rng.random() < mix_interest:
+            method, path, body = "GET", rng.choice(["/v1/interest/total?window=year", "/v1/interest/month/2025-07"]), None
+        else:
+            method, path, body = "POST", "/v1/answer", json.dumps({"question": rng.choice(questions)})
+        t0 = time.perf_counter()
+        try:
+            if conn is None: conn = http.client.HTTPConnection(u.hostname, u.port, timeout=120)
+            conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+            r = conn.getresponse(); r.read(); code = r.status
+        except (OSError, http.client.HTTPException) as e:
+            code = type(e).__name__; conn = None
+        lat.append((time.perf_counter() - t0) * 1000); codes[code] = codes.get(code, 0) + 1
+    with lock: out.append((lat, codes))
+
+def run(url: str, concurrency: int, duration: float, questions=QUESTIONS, mix_interest: float = 0.1,
+        warmup: float = 2.0) -> dict:
+    if warmup > 0: run(url, concurrency, warmup, questions, mix_interest, warmup=0)
+    out, lock = [], threading.Lock()
+    stop = time.perf_counter() + duration
+    threads = [threading.Thread(target=_client, args=(url, questions, mix_interest, stop, out, lock, i))
+               for i in range(concurrency)]
+    t0 = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    dt = time.perf_counter() - t0
+    lat = np.array([x for l, _ in out for x in l]) if out else np.zeros(0)
+    codes: dict = {}
+    for _, c in out:
+        for k, v in c.items(): codes[str(k)] = codes.get(str(k), 0) + v
+    ok = codes.get("200", 0)
+    pct = lambda p: round(float(np.percentile(lat, p)), 2) if len(lat) else None
+    return {"url": url, "concurrency": concurrency, "seconds": round(dt, 2), "requests": int(len(lat)),
+            "rps": round(len(lat) / dt, 1) if dt else None, "ok_rps": round(ok / dt, 1) if dt else None,
+            "p50_ms": pct(50), "p90_ms": pct(90), "p99_ms": pct(99), "max_ms": pct(100), "status": codes}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default="http://127.0.0.1:8000")
+    ap.add_argument("--concurrency", default="16", help="comma list to sweep, e.g. 1,8,32")
+    ap.add_argument("--duration", type=float, default=20.0)
+    ap.add_argument("--mix-interest", type=float, default=0.1, help="share of direct interest-endpoint calls")
+    ap.add_argument("--spawn", action="store_true", help="start stub LLM + API server locally")
+    ap.add_argument("--stub-latency-ms", type=float, default=300.0)
+    ap.add_argument("--api-workers", type=int, default=None)
+    ap.add_argument("--llm-cache", action="store_true", help="keep the in-memory LLM answer cache on when spawning")
+    ap.add_argument("--json", default=None)
+    a = ap.parse_args()
+    procs, url = [], a.url
+    if a.spawn:
+        port = _free_port(); url = f"http://127.0.0.1:{port}"
+        procs = spawn(a.stub_latency_ms, port, {"API_WORKERS": str(a.api_workers)} if a.api_workers else {}, a.llm_cache)
+    try:
+        _wait(url, timeout=600)
+        rows = []
+        for c in [int(x) for x in a.concurrency.split(",")]:
+            r = run(url, c, a.duration, mix_interest=a.mix_interest); rows.append(r)
+            print(f"c={c:>4}  {r['rps']:>8} rps  p50={r['p50_ms']}ms  p90={r['p90_ms']}ms  p99={r['p99_ms']}ms  "
+                  f"status={r['status']}")
+        if a.json:
+            with open(a.json, "w") as f: json.dump(rows, f, indent=2)
+    finally:
+        for p in procs: p.terminate()
+        for p in procs: p.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Nightly interest reconciliation over many account data directories.
+
+    python -m scripts.reconcile --root /data/accounts --out ./reports --workers 8 --chunksize 64
+
+Each account directory holds the usual statements/transactions/account_summary files and optionally an
+agreement.json; --agreement supplies the default for accounts without one.
+"""
+import argparse, json
+from app.core.schemas import Agreement
+from app.services.reconcile import run
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", required=True)
+    ap.add_argument("--out", default="./reports")
+    ap.add_argument("--workers", type=int, default=0, help="processes (0 = all cores, 1 = in-process)")
+    ap.add_argument("--chunksize", type=int, default=64)
+    ap.add_argument("--agreement", default=None, help="default agreement.json")
+    a = ap.parse_args()
+    ag = None
+    if a.agreement:
+        with open(a.agreement) as f: ag = Agreement(**json.load(f))
+    print(json.dumps(run(a.root, a.out, workers=a.workers, chunksize=a.chunksize, default_agreement=ag), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""Stream a data directory into the persisted FAISS index without materialising the corpus.
+
+    EMBED_WORKERS=4 python -m scripts.reindex --data ./data --batch 1024
+"""
+import argparse, json, time
+from app.utils.loader import iter_corpus
+from app.services.indexer import sync_index, INDEX_DIR
+from app.services.embedder import EMBED_BATCH, cache_stats
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data", default="./data")
+    ap.add_argument("--index-dir", default=INDEX_DIR)
+    ap.add_argument("--batch", type=int, default=EMBED_BATCH)
+    ap.add_argument("--workers", type=int, default=None, help="embedding processes (default EMBED_WORKERS)")
+    a = ap.parse_args()
+    t0 = time.perf_counter()
+    store, stats = sync_index(iter_corpus(a.data), index_dir=a.index_dir, batch_size=a.batch, workers=a.workers)
+    dt = time.perf_counter() - t0
+    embedded = stats["added"] + stats["updated"]
+    print(json.dumps({**stats, "vectors": len(store), "kind": store.kind, "seconds": round(dt, 2),
+                      "embedded_per_s": round(embedded / dt, 1) if dt else None, "cache": cache_stats()}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Minimal OpenAI-compatible chat-completions server for local testing and load tests.
+
+    python -m scripts.stub_llm --port 8901 --latency-ms 200 --fail-rate 0.1
+    OPENAI_BASE_URL=http://127.0.0.1:8901/v1 streamlit run app.py
+"""
+import argparse, json, random, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def reply_for(body: dict) -> str:
+    q = body.get("messages", [{}])[-1].get("content", "")
+    q = q.rsplit("Question:", 1)[-1].strip()[:200]
+    return json.dumps({"answer": f"(stub) {q}", "used_fields": [], "notes": "stub LLM"})
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency, fail_rate, token_delay, hits = 0.0, 0.0, 0.0, 0
+    lock = threading.Lock()
+
+    def log_message(self, *a): pass
+
+    def _send(self, code: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers(); self.wfile.write(data)
+
+    def _stream(self, body: dict):
+        # server-sent chat.completion.chunk events, a few characters per token
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        text, base = reply_for(body), {"id": f"stub-{Handler.hits}", "object": "chat.completion.chunk",
+                                        "created": int(time.time()), "model": body.get("model", "stub")}
+        for i in range(0, len(text), 4):
+            ev = {**base, "choices": [{"index": 0, "delta": {"content": text[i:i+4]}, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(ev)}\n\n".encode()); self.wfile.flush()
+            time.sleep(self.token_delay)
+        ev = {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        self.wfile.write(f"data: {json.dumps(ev)}\n\ndata: [DONE]\n\n".encode()); self.wfile.flush()
+        self.close_connection = True
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with Handler.lock: Handler.hits += 1
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._send(404, {"error": {"message": "not found"}})
+        time.sleep(self.latency)
+        if random.random() < self.fail_rate:
+            return self._send(500, {"error": {"message": "stub failure", "type": "server_error"}})
+        if body.get("stream"):
+            return self._stream(body)
+        self._send(200, {"id": f"stub-{Handler.hits}", "object": "chat.completion", "created": int(time.time()),
+                         "model": body.get("model", "stub"),
+                         "choices": [{"index": 0, "finish_reason": "stop",
+                                      "message": {"role": "assistant", "content": reply_for(body)}}],
+                         "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}})
+
+def serve(host: str = "127.0.0.1", port: int = 8901, latency_ms: float = 0.0, fail_rate: float = 0.0,
+          token_ms: float = 0.0) -> ThreadingHTTPServer:
+    Handler.latency, Handler.fail_rate, Handler.token_delay = latency_ms / 1000.0, fail_rate, token_ms / 1000.0
+    srv = ThreadingHTTPServer((host, port), Handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8901)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    ap.add_argument("--token-ms", type=float, default=0.0, help="delay between streamed chunks")
+    a = ap.parse_args()
+    srv = serve(a.host, a.port, a.latency_ms, a.fail_rate, a.token_ms)
+    print(f"stub LLM on http://{a.host}:{srv.server_address[1]}/v1")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import numpy as np
+from app.core.rag import bm25
+from app.core.rag.bm25 import BM25
+
+TEXTS = ["Interest charged 2025-03-14", "payment posted", "", "purchase at grocery, purchase at fuel",
+         "interest interest payment", "Statement for March"] * 7
+
+def test_build_is_independent_of_batch_size(monkeypatch):
+    ref = BM25.build(iter(TEXTS))
+    for batch in (1, 5, 8):
+        monkeypatch.setattr(bm25, "BUILD_BATCH", batch)
+        got = BM25.build(iter(TEXTS))
+        assert got.vocab == ref.vocab and got.n_docs == ref.n_docs == len(TEXTS)
+        for f in ("indptr", "doc_ids", "weights", "idf"):
+            assert np.array_equal(getattr(got, f), getattr(ref, f)), f
+
+def test_search_ranks_term_frequency_and_month_names():
+    idx = BM25.build(TEXTS[:6])
+    assert idx.search("interest", k=1)[0][1] == 4
+    assert {d for _, d in idx.search("march")} == {0, 5}
+    assert BM25.build(["", " "]).search("interest") == []
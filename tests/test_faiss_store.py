@@ -0,0 +1,22 @@
+import numpy as np
+from app.core.rag import faiss_store
+from app.core.rag.faiss_store import FaissStore, content_hash
+
+def _embed(texts):
+    return np.stack([np.random.default_rng(content_hash(t)).standard_normal(16).astype("float32") for t in texts])
+
+def test_hnsw_resync_rebuilds_the_graph_once(monkeypatch):
+    items = [(f"k{i}", f"text {i}", {"rtype": "transactions", "rid": i}) for i in range(3000)]
+    st = FaissStore(16, config={"kind": "hnsw"})
+    st.sync(items, embed=_embed, batch_size=100)
+    builds = []
+    make = faiss_store._make_index
+    monkeypatch.setattr(faiss_store, "_make_index", lambda *a: builds.append(a) or make(*a))
+    changed = [(k, t + " v2" if i % 5 == 0 else t, p) for i, (k, t, p) in enumerate(items) if i % 9]
+    changed += [(f"new{i}", f"new {i}", {"rtype": "payments", "rid": i}) for i in range(200)]
+    stats = st.sync(changed, embed=_embed, batch_size=100)
+    assert len(builds) == 1
+    assert len(st) == len(st.keys) == len(changed)
+    assert stats["updated"] and stats["removed"] and stats["added"] == 200
+    score, hit = st.search(_embed(["text 5 v2"]), 1)[0]
+    assert hit == {"rtype": "transactions", "rid": 5} and score > 0.99
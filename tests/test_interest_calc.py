@@ -0,0 +1,34 @@
+import calendar
+from datetime import date, datetime, timezone
+import numpy as np
+import pytest
+from app.core.schemas import Transaction
+from app.core.txn_table import TransactionTable
+from app.services.interest_calc import build_daily_balances_tz, monthly_interest_from_daily, period_interest
+
+def _ledger(rng, n: int, step_cents: int) -> TransactionTable:
+    lo, hi = (int(datetime(2025, m, 1, tzinfo=timezone.utc).timestamp()) for m in (1, 12))
+    bal, txs = 0, []
+    for i, ts in enumerate(np.sort(rng.integers(lo, hi, n)).tolist()):
+        typ = "PAYMENT" if rng.random() < 0.2 else "PURCHASE"
+        cents = int(rng.integers(1, 400)) * step_cents
+        bal += -cents if typ == "PAYMENT" else cents
+        txs.append(Transaction(transactionId=f"t-{i}", transactionType=typ, transactionStatus="POSTED",
+                               transactionDateTime=datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                               amount=cents / 100, endingBalance=bal / 100))
+    return TransactionTable.from_records(txs)
+
+@pytest.mark.parametrize("seed", range(12))
+def test_period_interest_daily_then_sum_matches_scalar(seed):
+    rng = np.random.default_rng(seed)
+    # round-dollar amounts with APRs like 18.25/365 put many days exactly on a half cent
+    step = 500 if seed % 2 else 1
+    apr = float(rng.choice([18.25, 36.5, 7.3])) if seed % 3 == 0 else round(float(rng.uniform(1, 40)), 2)
+    basis = 365 if seed % 4 else 360
+    tz = ("UTC", "America/New_York", "Asia/Kolkata")[seed % 3]
+    tbl = _ledger(rng, 400, step)
+    periods = [(date(2025, m, 1), date(2025, m, calendar.monthrange(2025, m)[1])) for m in range(2, 12)]
+    got = period_interest(tbl, periods, {"purchaseApr": apr}, basis, "daily_then_sum", tz)
+    for (first, last), r in zip(periods, got):
+        daily = build_daily_balances_tz(tbl, first, last, tz)
+        assert r["purchaseApr"] == monthly_interest_from_daily(daily, apr, basis, "daily_then_sum"), (first, apr, basis)
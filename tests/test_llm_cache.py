@@ -0,0 +1,12 @@
+import time
+from app.services.llm_cache import ResponseCache
+
+def test_disk_hit_promoted_to_memory_keeps_its_age(tmp_path, monkeypatch):
+    path = str(tmp_path / "llm.sqlite")
+    ResponseCache(path, ttl=100).put("k", {"answer": "a"})
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 60)
+    cache = ResponseCache(path, ttl=100)   # fresh process: empty memory tier
+    assert cache.get("k") == {"answer": "a"}
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    assert cache.get("k") is None   # 120s after it was written, even though it was promoted at 60s
@@ -0,0 +1,27 @@
+import json
+import pytest
+from app.utils import loader
+from app.utils.loader import iter_records
+
+def _txn(i: int) -> str:
+    return json.dumps({"transactionId": f"t-{i}", "transactionType": "PURCHASE", "transactionStatus": "POSTED",
+                       "transactionDateTime": "2025-06-01T12:00:00Z", "amount": 1.0 + i, "endingBalance": 10.0 + i})
+
+@pytest.mark.parametrize("chunk", [1 << 20, 64, 5])
+def test_bad_row_mid_array_is_rejected_alone(tmp_path, monkeypatch, chunk):
+    monkeypatch.setattr(loader, "CHUNK", chunk)
+    rows = [_txn(i) for i in range(50)]
+    rows[20] = '{"transactionId": "t-20", "amount": oops, "note": "a, ] } [ {"}'
+    (tmp_path / "transactions.json").write_text("[\n" + ",\n".join(rows) + "\n]\n")
+    rejects = []
+    got = list(iter_records(str(tmp_path), "transactions", rejects))
+    assert [t.transactionId for t in got] == [f"t-{i}" for i in range(50) if i != 20]
+    assert [(r.row, r.error.startswith("invalid JSON")) for r in rejects] == [(20, True)]
+
+def test_truncated_array_keeps_rows_before_the_cut(tmp_path, monkeypatch):
+    monkeypatch.setattr(loader, "CHUNK", 16)
+    (tmp_path / "transactions.json").write_text("[" + ",".join(_txn(i) for i in range(3)) + ',{"transactionId": "t-')
+    rejects = []
+    got = list(iter_records(str(tmp_path), "transactions", rejects))
+    assert [t.transactionId for t in got] == ["t-0", "t-1", "t-2"]
+    assert [r.row for r in rejects] == [3]
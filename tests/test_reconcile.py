@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.core.schemas import Statement
+from app.services.reconcile import statement_period
+
+def _statements(opens):
+    # each statement closes 3s before the next one opens, as in the sample data
+    fmt = lambda t: t.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return [Statement(statementId=f"st-{i}", openingDateTime=fmt(a), closingDateTime=fmt(b - timedelta(seconds=3)),
+                      dueDate="2026-01-01") for i, (a, b) in enumerate(zip(opens, opens[1:]))]
+
+@pytest.mark.parametrize("tz", ["UTC", "America/New_York", "Asia/Kolkata", "Pacific/Auckland"])
+@pytest.mark.parametrize("hour", [0, 4, 13])
+def test_consecutive_periods_neither_overlap_nor_leave_gaps(tz, hour):
+    opens = [datetime(2024 + m // 12, m % 12 + 1, 1, hour, tzinfo=timezone.utc) for m in range(14)]
+    periods = [statement_period(s, tz) for s in _statements(opens)]
+    for (_, last), (first, _) in zip(periods, periods[1:]):
+        assert first == last + timedelta(days=1)
+    assert all(first <= last for first, last in periods)
+
+def test_utc_midnight_statements_map_to_calendar_months_in_new_york():
+    opens = [datetime(2025, m, 1, tzinfo=timezone.utc) for m in (6, 7, 8, 9)]
+    periods = [statement_period(s, "America/New_York") for s in _statements(opens)]
+    assert [(a.isoformat(), b.isoformat()) for a, b in periods] == [
+        ("2025-06-01", "2025-06-30"), ("2025-07-01", "2025-07-31"), ("2025-08-01", "2025-08-31")]
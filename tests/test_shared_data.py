@@ -0,0 +1,23 @@
+import os
+from types import SimpleNamespace
+from app.services import shared_data
+from app.services.shared_data import SharedData
+
+def test_edit_during_a_build_triggers_another_rebuild(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_data, "build_snapshot", lambda corpus, agreement, version, fp: SimpleNamespace(
+        corpus=corpus, agreement=agreement, version=version, fingerprint=fp, index_stats={}))
+    f = tmp_path / "transactions.json"
+    f.write_text("v1")
+    loads = []
+    def loader(data_dir):
+        content = f.read_text()
+        loads.append(content)
+        if content == "v2":   # the file is edited again while the v2 snapshot is being built
+            f.write_text("v3!"); os.utime(f, ns=(1, 1))
+        return {"content": content}, None
+    sd = SharedData(str(tmp_path), poll=0, loader=loader)
+    f.write_text("v2"); os.utime(f, ns=(2, 2))
+    snap = sd.reload()
+    assert loads == ["v1", "v2", "v3!"]
+    assert snap.corpus["content"] == "v3!" and snap.version == 3
+    assert sd.current() is snap